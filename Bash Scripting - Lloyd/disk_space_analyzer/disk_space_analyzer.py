@@ -1,105 +1,457 @@
 import os
 import argparse
-from typing import List, Tuple
+import csv
+import heapq
+import json
+import sqlite3
+import sys
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from stat import S_ISDIR
+from typing import Dict, List, Optional, TextIO, Tuple
 from pathlib import Path
 
+# One row of the scan index: a directory's identity, the total size of the
+# files directly inside it, the names of its subdirectories and, for reported
+# directories, its reportable files (see ScanIndex).
+IndexEntry = namedtuple('IndexEntry', ['inode', 'mtime_ns', 'size', 'subdirs', 'files'])
+
+
+class ScanIndex:
+    """
+    On-disk index of directories from a previous scan, stored in SQLite.
+
+    A directory whose inode and mtime are unchanged has had no entries added,
+    removed or renamed, so its own file total and subdirectory names can be
+    reused without listing it again. Directories that were reported also keep
+    their files at or above the minimum size as (name, size, mtime) and the
+    (count, size, mtime) of the smaller ones, stored as JSON with the minimum
+    size they were collected for, so they can be reported again from the index.
+    """
+
+    def __init__(self, index_file: str):
+        self.index_file = index_file
+        self.conn = sqlite3.connect(index_file)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS dirs (
+                path TEXT PRIMARY KEY,
+                inode INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                subdirs TEXT NOT NULL,
+                files TEXT
+            )
+        """)
+        # Indexes written before file entries were stored
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(dirs)")]
+        if 'files' not in columns:
+            self.conn.execute("ALTER TABLE dirs ADD COLUMN files TEXT")
+
+    @staticmethod
+    def _subtree(root: str) -> Tuple[str, str, str]:
+        # Paths equal to root, or sorting between "root/" and "root0" ('0' follows '/')
+        prefix = root.rstrip(os.sep)
+        return prefix, prefix + os.sep, prefix + chr(ord(os.sep) + 1)
+
+    def load(self, root: str) -> Dict[str, IndexEntry]:
+        """Load the entries of every directory under root."""
+        rows = self.conn.execute(
+            "SELECT path, inode, mtime_ns, size, subdirs, files FROM dirs "
+            "WHERE path = ? OR (path >= ? AND path < ?)",
+            self._subtree(root)
+        )
+        return {
+            path: IndexEntry(inode, mtime_ns, size, subdirs.split('\0') if subdirs else [],
+                             json.loads(files) if files else None)
+            for path, inode, mtime_ns, size, subdirs, files in rows
+        }
+
+    def save(self, root: str, entries: Dict[str, IndexEntry]):
+        """Replace the entries under root with those of the latest scan."""
+        with self.conn:
+            self.conn.execute("DELETE FROM dirs WHERE path = ? OR (path >= ? AND path < ?)", self._subtree(root))
+            self.conn.executemany(
+                "INSERT INTO dirs (path, inode, mtime_ns, size, subdirs, files) VALUES (?, ?, ?, ?, ?, ?)",
+                ((path, e.inode, e.mtime_ns, e.size, '\0'.join(e.subdirs),
+                  json.dumps(e.files) if e.files is not None else None)
+                 for path, e in entries.items())
+            )
+
+    def close(self):
+        self.conn.close()
+
+
+class FileNode:
+    """
+    A file in the scanned tree. Nodes keep only their own name; the full path of
+    a directory is rebuilt from its parents when needed.
+    """
+    __slots__ = ('name', 'size', 'mtime')
+    children = None
+    is_dir = False
+
+    def __init__(self, name: str, size: int, mtime: float):
+        self.name = name
+        self.size = size
+        self.mtime = mtime
+
+
+class SmallFilesNode(FileNode):
+    """Files below the minimum size in one directory, counted into a single entry."""
+    __slots__ = ()
+
+    def __init__(self, count: int, size: int, mtime: float):
+        super().__init__(f"({count} small files)", size, mtime)
+
+
+class DirNode(FileNode):
+    """
+    A directory in the scanned tree. Its size includes the whole subtree once
+    every subdirectory has completed (`pending` counts those still scanning).
+    """
+    __slots__ = ('children', 'parent', 'depth', 'pending')
+    is_dir = True
+
+    def __init__(self, name: str, mtime: float, parent: Optional['DirNode'] = None, depth: int = -1):
+        super().__init__(name, 0, mtime)
+        self.children = []
+        self.parent = parent
+        self.depth = depth
+        self.pending = 0
+
+    @property
+    def path(self) -> str:
+        names = []
+        node = self
+        while node.parent is not None:
+            names.append(node.name)
+            node = node.parent
+        return os.path.join(node.name, *reversed(names))
+
+
+class EntryWriter:
+    """Streams scanned entries as CSV rows or as the elements of a JSON array."""
+
+    def __init__(self, out: TextIO, fmt: str):
+        self.out = out
+        self.fmt = fmt
+        self.count = 0
+        if fmt == 'csv':
+            self.csv = csv.writer(out)
+            self.csv.writerow(['type', 'path', 'size', 'mtime'])
+        else:
+            out.write('[')
+
+    def write(self, kind: str, path: str, size: int, mtime: float):
+        modified = datetime.fromtimestamp(mtime).isoformat(timespec='seconds') if mtime else ''
+        if self.fmt == 'csv':
+            self.csv.writerow([kind, path, size, modified])
+        else:
+            record = json.dumps({'type': kind, 'path': path, 'size': size, 'mtime': modified})
+            self.out.write(('\n' if not self.count else ',\n') + record)
+        self.count += 1
+
+    def close(self):
+        if self.fmt == 'json':
+            self.out.write('\n]\n')
+        self.out.flush()
+
+
 class DiskUsageTree:
     def __init__(self, path: str, sort_by: str = 'size', reverse: bool = True, 
-                 min_size_mb: float = 0, max_depth: int = -1):
+                 min_size_mb: float = 0, max_depth: int = -1, workers: int = 8,
+                 index_file: Optional[str] = None, full_rescan: bool = False,
+                 aggregate_small: bool = False, top: int = 0, output_format: str = 'tree',
+                 output: Optional[TextIO] = None):
         self.path = os.path.abspath(path)
         self.sort_by = sort_by  # 'size', 'name', or 'mtime'
         self.reverse = reverse
         self.min_size_mb = min_size_mb
+        self.min_size_bytes = min_size_mb * 1024 * 1024
+        self.aggregate_small = aggregate_small
         self.max_depth = max_depth
+        self.workers = max(1, workers)
+        self.index_file = index_file
+        self.full_rescan = full_rescan
+        self.index = {}
         self.total_size = 0
+        self.dirs_scanned = 0
+        self.dirs_reused = 0
+        self.top = top
+        self.output_format = output_format
+        self.output = output or sys.stdout
+        # The full tree is only built for the tree view; --top and json/csv
+        # output handle entries as they are found instead.
+        self.build_tree = output_format == 'tree' and not top
+        self.largest = []  # min-heap of the `top` largest entries
+        self.writer = None
 
     def human_readable_size(self, size: int) -> str:
         """Convert bytes to human-readable format."""
         for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
             if size < 1024:
                 return f"{size:.2f} {unit}"
-            size = 1024
+            size /= 1024
         return f"{size:.2f} PB"
 
-    def get_file_info(self, path: str) -> Tuple[int, float]:
-        """Get size and modification time of a file or directory."""
+    def _reuse_dir(self, node: 'DirNode', path: str, depth: int, cached: IndexEntry,
+                   report: bool) -> Tuple[List[Tuple['DirNode', str, int, os.stat_result]], list]:
+        """
+        Take an unchanged directory's file total (and, when reported, its files)
+        from the index and stat only its subdirectories.
+        """
+        keep = report and self.build_tree
+        node.size += cached.size
+        subdirs = []
+        for name in cached.subdirs:
+            child_path = os.path.join(path, name)
+            try:
+                stat = os.stat(child_path, follow_symlinks=False)
+            except (OSError, PermissionError):
+                continue
+            if S_ISDIR(stat.st_mode):
+                child = DirNode(name, stat.st_mtime, node, depth)
+                subdirs.append((child, child_path, depth + 1, stat))
+                if keep:
+                    node.children.append(child)
+
+        files = []
+        if report:
+            for name, size, mtime in cached.files['files']:
+                if keep:
+                    node.children.append(FileNode(name, size, mtime))
+                else:
+                    files.append(('file', name, size, mtime))
+            small_count, small_size, small_mtime = cached.files['small']
+            if small_count and self.aggregate_small:
+                bucket = SmallFilesNode(small_count, small_size, small_mtime)
+                if keep:
+                    node.children.append(bucket)
+                else:
+                    files.append(('small_files', bucket.name, small_size, small_mtime))
+        return subdirs, files
+
+    def _reusable(self, cached: Optional[IndexEntry], dir_stat: os.stat_result, report: bool) -> bool:
+        """Whether an index entry still describes the directory, and has its files if they are needed."""
+        if not cached or cached.inode != dir_stat.st_ino or cached.mtime_ns != dir_stat.st_mtime_ns:
+            return False
+        return not report or (cached.files is not None and cached.files['min_size'] == self.min_size_bytes)
+
+    def _scan_dir(self, node: 'DirNode', path: str, depth: int, dir_stat: os.stat_result):
+        """
+        List a single directory with os.scandir, using each entry's stat() once.
+
+        File sizes are added to the directory's own size; files and subdirectories
+        are only reported while within max_depth, and files below min_size_mb are
+        never kept (with aggregate_small they are counted into one bucket).
+        Directories below max_depth that are unchanged since the indexed scan are
+        not listed again, as are reported directories whose files at or above
+        min_size_mb were indexed.
+
+        Returns the subdirectories still to be scanned as (node, path, depth, stat)
+        tuples, the directory's new index entry, whether the index was reused, and
+        the (kind, name, size, mtime) of reported files when no tree is being built.
+        """
+        report = self.max_depth < 0 or depth <= self.max_depth
+        keep = report and self.build_tree
+        cached = self.index.get(path)
+        if self._reusable(cached, dir_stat, report):
+            subdirs, files = self._reuse_dir(node, path, depth, cached, report)
+            return subdirs, cached, True, files
+
+        subdirs = []
+        files = []
+        indexed_files = []
+        small_count, small_size, small_mtime = 0, 0, 0.0
         try:
-            stat = os.stat(path)
-            if os.path.isdir(path):
-                size = 0
-                for root, _, files in os.walk(path):
-                    for file in files:
-                        try:
-                            file_path = os.path.join(root, file)
-                            size += os.path.getsize(file_path)
-                        except (OSError, PermissionError):
-                            continue
-            else:
-                size = stat.st_size
-            return size, stat.st_mtime
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        is_dir = entry.is_dir(follow_symlinks=False)
+                        stat = entry.stat(follow_symlinks=False)
+                    except (OSError, PermissionError):
+                        continue
+                    if is_dir:
+                        child = DirNode(entry.name, stat.st_mtime, node, depth)
+                        subdirs.append((child, entry.path, depth + 1, stat))
+                        if keep:
+                            node.children.append(child)
+                        continue
+
+                    node.size += stat.st_size
+                    if not report:
+                        continue
+                    if stat.st_size >= self.min_size_bytes:
+                        indexed_files.append((entry.name, stat.st_size, stat.st_mtime))
+                        if keep:
+                            node.children.append(FileNode(entry.name, stat.st_size, stat.st_mtime))
+                        else:
+                            files.append(('file', entry.name, stat.st_size, stat.st_mtime))
+                    else:
+                        small_count += 1
+                        small_size += stat.st_size
+                        small_mtime = max(small_mtime, stat.st_mtime)
         except (OSError, PermissionError):
-            return 0, 0
+            pass
 
-    def collect_tree(self, path: str, depth: int = 0) -> List[dict]:
-        """Recursively collect directory and file information."""
-        if self.max_depth >= 0 and depth > self.max_depth:
-            return []
+        if small_count and self.aggregate_small:
+            bucket = SmallFilesNode(small_count, small_size, small_mtime)
+            if keep:
+                node.children.append(bucket)
+            else:
+                files.append(('small_files', bucket.name, small_size, small_mtime))
+        indexed = None
+        if report:
+            indexed = {'min_size': self.min_size_bytes, 'files': indexed_files,
+                       'small': [small_count, small_size, small_mtime]}
+        entry = IndexEntry(dir_stat.st_ino, dir_stat.st_mtime_ns, node.size,
+                           [child.name for child, *_ in subdirs], indexed)
+        return subdirs, entry, False, files
+
+    def _report(self, kind: str, path: str, size: int, mtime: float):
+        """Hand a finished entry to the top-N heap or the streaming writer."""
+        if self.top:
+            item = (size, path, kind, mtime)
+            if len(self.largest) < self.top:
+                heapq.heappush(self.largest, item)
+            elif item > self.largest[0]:
+                heapq.heapreplace(self.largest, item)
+        elif self.writer:
+            self.writer.write(kind, path, size, mtime)
 
-        items = []
+    def _complete(self, node: 'DirNode'):
+        """
+        Called once a directory and all of its subdirectories are scanned: its
+        size is final, so report it and add it to its parent, completing the
+        parent in turn if this was its last pending subdirectory.
+        """
+        while node is not None:
+            if not self.build_tree and (node.parent is None or (
+                    (self.max_depth < 0 or node.depth <= self.max_depth)
+                    and node.size >= self.min_size_bytes)):
+                self._report('dir', node.path, node.size, node.mtime)
+            parent = node.parent
+            if parent is None:
+                return
+            parent.size += node.size
+            parent.pending -= 1
+            if parent.pending:
+                return
+            node = parent
+
+    def collect_tree(self, path: str, depth: int = 0) -> List['FileNode']:
+        """
+        Collect directory and file information in a single bottom-up pass.
+
+        Directories are scanned concurrently by a pool of `workers` threads, each
+        task listing one directory and handing its subdirectories back to be
+        scheduled. A directory's size is final as soon as its last subdirectory
+        completes, so each entry is stat'ed exactly once and, for --top and
+        json/csv output, reported as soon as it is known.
+
+        With an index_file, directory totals are persisted and reused on the next
+        run for directories whose mtime has not changed.
+        """
         try:
-            for entry in os.scandir(path):
-                try:
-                    size, mtime = self.get_file_info(entry.path)
-                    if size / (1024 * 1024) < self.min_size_mb:
-                        continue
-                    items.append({
-                        'name': entry.name,
-                        'path': entry.path,
-                        'size': size,
-                        'mtime': mtime,
-                        'is_dir': entry.is_dir(),
-                        'children': [] if entry.is_dir() else None
-                    })
-                except (OSError, PermissionError):
-                    continue
+            root_stat = os.stat(path)
         except (OSError, PermissionError):
             return []
+        root = DirNode(path, root_stat.st_mtime)
+        new_index = {}
+
+        scan_index = ScanIndex(self.index_file) if self.index_file else None
+        if scan_index and not self.full_rescan:
+            self.index = scan_index.load(path)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            pending = {executor.submit(self._scan_dir, root, path, depth, root_stat): (root, path)}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    node, dir_path = pending.pop(future)
+                    subdirs, entry, reused, files = future.result()
+                    new_index[dir_path] = entry
+                    self.dirs_scanned += 1
+                    self.dirs_reused += reused
+                    for kind, name, size, mtime in files:
+                        self._report(kind, os.path.join(dir_path, name), size, mtime)
+
+                    node.pending = len(subdirs)
+                    for child, child_path, child_depth, child_stat in subdirs:
+                        future = executor.submit(self._scan_dir, child, child_path, child_depth, child_stat)
+                        pending[future] = (child, child_path)
+                    if not subdirs:
+                        self._complete(node)
 
+        if scan_index:
+            scan_index.save(path, new_index)
+            scan_index.close()
+            self.index = {}
+
+        self.total_size = root.size
+        return self._filter_and_sort(root.children)
+
+    def _filter_and_sort(self, items: List['FileNode']) -> List['FileNode']:
+        """Drop directories below min_size_mb and sort every level of the tree."""
+        items = [item for item in items
+                 if item.size >= self.min_size_bytes or isinstance(item, SmallFilesNode)]
         for item in items:
-            if item['is_dir']:
-                item['children'] = self.collect_tree(item['path'], depth + 1)
-                item['size'] = sum(child['size'] for child in item['children'])
+            if item.children:
+                item.children = self._filter_and_sort(item.children)
 
         # Sort items
         if self.sort_by == 'size':
-            items.sort(key=lambda x: x['size'], reverse=self.reverse)
+            items.sort(key=lambda x: x.size, reverse=self.reverse)
         elif self.sort_by == 'name':
-            items.sort(key=lambda x: x['name'].lower(), reverse=self.reverse)
+            items.sort(key=lambda x: x.name.lower(), reverse=self.reverse)
         elif self.sort_by == 'mtime':
-            items.sort(key=lambda x: x['mtime'], reverse=self.reverse)
+            items.sort(key=lambda x: x.mtime, reverse=self.reverse)
 
         return items
 
-    def print_tree(self, items: List[dict], prefix: str = '', depth: int = 0):
+    def print_tree(self, items: List['FileNode'], prefix: str = '', depth: int = 0):
         """Print the tree structure."""
         for i, item in enumerate(items):
             is_last = i == len(items) - 1
             connector = '└── ' if is_last else '├── '
-            print(f"{prefix}{connector}{item['name']} ({self.human_readable_size(item['size'])})")
-            if item['children']:
+            print(f"{prefix}{connector}{item.name} ({self.human_readable_size(item.size)})")
+            if item.children:
                 new_prefix = prefix + ('    ' if is_last else '│   ')
-                self.print_tree(item['children'], new_prefix, depth + 1)
+                self.print_tree(item.children, new_prefix, depth + 1)
+
+    def print_top(self):
+        """Print the largest entries found, biggest first."""
+        print(f"\nTop {len(self.largest)} largest entries:")
+        for size, path, kind, _ in sorted(self.largest, reverse=True):
+            suffix = os.sep if kind == 'dir' else ''
+            print(f"{self.human_readable_size(size):>12}  {path}{suffix}")
 
     def run(self):
         """Run the disk usage analysis."""
         if not os.path.exists(self.path):
-            print(f"Error: Path '{self.path}' does not exist")
+            print(f"Error: Path '{self.path}' does not exist", file=sys.stderr)
+            return
+
+        if self.output_format != 'tree':
+            # Machine-readable output: entries are written as the scan finds them
+            # (or, with --top, once the scan is over).
+            self.writer = EntryWriter(self.output, self.output_format)
+            self.collect_tree(self.path)
+            if self.top:
+                for size, path, kind, mtime in sorted(self.largest, reverse=True):
+                    self.writer.write(kind, path, size, mtime)
+            self.writer.close()
             return
 
         print(f"Disk usage for: {self.path}")
         items = self.collect_tree(self.path)
-        self.total_size = sum(item['size'] for item in items)
         print(f"Total size: {self.human_readable_size(self.total_size)}")
+        if self.index_file:
+            print(f"Reused {self.dirs_reused} of {self.dirs_scanned} directories from {self.index_file}")
+        if self.top:
+            self.print_top()
+            return
         print("\nDirectory tree:")
         self.print_tree(items)
 
@@ -111,19 +463,46 @@ def main():
     parser.add_argument('--reverse', action='store_true', help="Reverse sort order")
     parser.add_argument('--min-size', type=float, default=0,
                         help="Minimum size in MB to display")
+    parser.add_argument('--aggregate-small', action='store_true',
+                        help="Show files below --min-size as one \"(N small files)\" entry per directory")
     parser.add_argument('--max-depth', type=int, default=-1,
                         help="Maximum depth to display (-1 for unlimited)")
+    parser.add_argument('--workers', type=int, default=8,
+                        help="Number of threads scanning directories in parallel")
+    parser.add_argument('--index', metavar='FILE',
+                        help="Persist directory totals and files at or above --min-size to FILE, and reuse "
+                             "directories whose inode and mtime are unchanged on the next run (files that "
+                             "change in place are missed until their directory changes; see --full-rescan)")
+    parser.add_argument('--full-rescan', action='store_true',
+                        help="Ignore the index and list every directory again (the index is still updated)")
+    parser.add_argument('--top', type=int, default=0, metavar='N',
+                        help="Only report the N largest files and directories")
+    parser.add_argument('--format', choices=['tree', 'json', 'csv'], default='tree',
+                        help="Output a tree (default), or stream entries as JSON or CSV")
+    parser.add_argument('--output', metavar='FILE', help="Write json/csv output to FILE instead of stdout")
 
     args = parser.parse_args()
     
+    output = open(args.output, 'w', newline='') if args.output else None
     tree = DiskUsageTree(
         path=args.path,
         sort_by=args.sort,
         reverse=args.reverse,
         min_size_mb=args.min_size,
-        max_depth=args.max_depth
+        max_depth=args.max_depth,
+        workers=args.workers,
+        index_file=args.index,
+        full_rescan=args.full_rescan,
+        aggregate_small=args.aggregate_small,
+        top=args.top,
+        output_format=args.format,
+        output=output
     )
-    tree.run()
+    try:
+        tree.run()
+    finally:
+        if output:
+            output.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,49 +1,350 @@
 import os
+import argparse
+import errno
 import hashlib
+import json
 import shutil
+import sqlite3
+import sys
+import time
 from collections import defaultdict
+from contextlib import nullcontext, redirect_stdout
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Hash functions selectable with --hash. blake2b is much faster than md5 on
+# 64-bit CPUs; xxh64 (non-cryptographic) is offered when xxhash is installed.
+HASH_ALGORITHMS = {
+    'md5': hashlib.md5,
+    'sha256': hashlib.sha256,
+    'blake2b': lambda: hashlib.blake2b(digest_size=16),
+}
+if xxhash:
+    HASH_ALGORITHMS['xxh64'] = xxhash.xxh64
+
+# Bytes read from the start and the end of each file for the partial hash
+PARTIAL_BLOCK_SIZE = 4096
+# Bytes read per call when hashing whole files
+DEFAULT_BLOCK_SIZE = 1024 * 1024
+
+def calculate_hash(file_path, algorithm='md5', block_size=DEFAULT_BLOCK_SIZE):
+    """Calculate the hash of a file's full content."""
+    if block_size <= 0:
+        # f.read(0) returns b'' at once, which would give every file the hash of empty input
+        raise ValueError(f"block_size must be positive, got {block_size}")
+    hasher = HASH_ALGORITHMS[algorithm]()
+    try:
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(block_size), b''):
+                hasher.update(block)
+        return hasher.hexdigest()
+    except (IOError, PermissionError) as e:
+        print(f"Error reading {file_path}: {e}")
+        return None
 
 def calculate_md5(file_path, block_size=65536):
     """Calculate MD5 hash of a file."""
-    md5 = hashlib.md5()
+    return calculate_hash(file_path, 'md5', block_size)
+
+def calculate_partial_hash(file_path, file_size, algorithm='md5', block_size=PARTIAL_BLOCK_SIZE):
+    """
+    Hash the first and last block_size bytes of a file. Files no larger than two
+    blocks are read whole, so their partial hash is also their full hash.
+    """
+    hasher = HASH_ALGORITHMS[algorithm]()
     try:
         with open(file_path, 'rb') as f:
-            for block in iter(lambda: f.read(block_size), b''):
-                md5.update(block)
-        return md5.hexdigest()
+            if file_size <= 2 * block_size:
+                hasher.update(f.read())
+            else:
+                hasher.update(f.read(block_size))
+                f.seek(-block_size, os.SEEK_END)
+                hasher.update(f.read(block_size))
+        return hasher.hexdigest()
     except (IOError, PermissionError) as e:
         print(f"Error reading {file_path}: {e}")
         return None
 
-def find_duplicates(directory):
-    """Find duplicate files based on size and MD5 hash."""
-    # Dictionary to store size -> list of files
-    size_dict = defaultdict(list)
-    # Dictionary to store hash -> list of files
-    hash_dict = defaultdict(list)
+class HashCache:
+    """
+    Hashes from earlier runs, stored in SQLite and keyed by path.
 
-    print(f"Scanning directory: {directory}")
-    
-    # Step 1: Group files by size
-    for root, _, files in os.walk(directory):
+    A stored hash is reused while the file's size, mtime and inode are unchanged
+    and it was computed with the same algorithm; anything else counts as a miss
+    and is rehashed.
+    """
+
+    def __init__(self, cache_file):
+        self.cache_file = cache_file
+        self.conn = sqlite3.connect(cache_file)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS hashes (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                inode INTEGER NOT NULL,
+                algorithm TEXT NOT NULL,
+                partial_hash TEXT,
+                full_hash TEXT
+            )
+        """)
+        # path -> [size, mtime_ns, inode, algorithm, partial_hash, full_hash]
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self.pruned = 0
+
+    @staticmethod
+    def _subtree(root):
+        # Paths sorting between "root/" and "root0" ('0' follows '/')
+        prefix = root.rstrip(os.sep)
+        return prefix + os.sep, prefix + chr(ord(os.sep) + 1)
+
+    def load(self, roots):
+        """Load the stored hashes of every file under the given roots."""
+        for root in roots:
+            rows = self.conn.execute("SELECT * FROM hashes WHERE path >= ? AND path < ?", self._subtree(root))
+            self.entries.update((row[0], list(row[1:])) for row in rows)
+
+    def get(self, file_path, signature, algorithm, partial):
+        """Return the stored partial or full hash if the file is unchanged, else None."""
+        entry = self.entries.get(file_path)
+        file_hash = None
+        if entry and entry[:4] == [*signature, algorithm]:
+            file_hash = entry[4] if partial else entry[5]
+        if file_hash:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return file_hash
+
+    def put(self, file_path, signature, algorithm, partial, file_hash):
+        entry = self.entries.get(file_path)
+        if not entry or entry[:4] != [*signature, algorithm]:
+            entry = self.entries[file_path] = [*signature, algorithm, None, None]
+        entry[4 if partial else 5] = file_hash
+
+    def save(self, roots, seen_paths):
+        """Replace the entries under the given roots, dropping files that no longer exist."""
+        # Paths not seen this run may still exist, e.g. extra links dropped by
+        # --skip-hardlinks or files that could not be stat'ed
+        stale = [path for path in self.entries
+                 if path not in seen_paths and not os.path.lexists(path)]
+        for path in stale:
+            del self.entries[path]
+        self.pruned += len(stale)
+        with self.conn:
+            for root in roots:
+                self.conn.execute("DELETE FROM hashes WHERE path >= ? AND path < ?", self._subtree(root))
+            self.conn.executemany("INSERT INTO hashes VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                  ((path, *entry) for path, entry in self.entries.items()))
+
+    def summary(self):
+        lookups = self.hits + self.misses
+        hit_rate = self.hits / lookups * 100 if lookups else 0.0
+        return (f"Hash cache: {self.hits} hits, {self.misses} misses ({hit_rate:.1f}% hit rate), "
+                f"{self.pruned} deleted files pruned")
+
+    def close(self):
+        self.conn.close()
+
+def normalize_roots(directories):
+    """
+    Return the directories as absolute paths, dropping repeats and directories
+    nested inside another root so that no file is scanned twice.
+    """
+    roots = []
+    for directory in sorted(set(os.path.abspath(d) for d in directories)):
+        if not any(os.path.commonpath([root, directory]) == root for root in roots):
+            roots.append(directory)
+    return roots
+
+def group_by_size(roots, skip_hardlinks=False, signatures=None):
+    """
+    Walk the root directories and group file paths by size. With skip_hardlinks, only the
+    first path seen for each (device, inode) is kept, since hard links share their
+    data and removing one reclaims no space. If a signatures dict is given, it is
+    filled with path -> (size, mtime_ns, inode) for the hash cache.
+    """
+    size_dict = defaultdict(list)
+    seen_inodes = set()
+    walk = (entry for directory in roots for entry in os.walk(directory))
+    for root, _, files in walk:
         for filename in files:
             file_path = os.path.join(root, filename)
             try:
-                file_size = os.path.getsize(file_path)
-                size_dict[file_size].append(file_path)
+                stat = os.stat(file_path)
             except (OSError, PermissionError) as e:
                 print(f"Error accessing {file_path}: {e}")
+                continue
+            if skip_hardlinks and stat.st_nlink > 1:
+                inode = (stat.st_dev, stat.st_ino)
+                if inode in seen_inodes:
+                    continue
+                seen_inodes.add(inode)
+            size_dict[stat.st_size].append(file_path)
+            if signatures is not None:
+                signatures[file_path] = (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+    return size_dict
+
+class HashProgress:
+    """Tracks files and bytes hashed and prints throughput while hashing runs."""
+
+    def __init__(self, interval=0.5):
+        self.interval = interval
+        self.files = 0
+        self.bytes = 0
+        self.start = time.perf_counter()
+        self.last_report = self.start
+
+    def update(self, file_bytes):
+        self.files += 1
+        self.bytes += file_bytes
+        now = time.perf_counter()
+        if now - self.last_report >= self.interval:
+            self.last_report = now
+            print(f"\r{self.summary()}", end='', flush=True)
+
+    def summary(self):
+        elapsed = max(time.perf_counter() - self.start, 1e-9)
+        return (f"Hashed {self.files} files ({self.bytes / 1024 / 1024:.1f} MB) in {elapsed:.1f}s: "
+                f"{self.files / elapsed:.1f} files/s, {self.bytes / 1024 / 1024 / elapsed:.1f} MB/s")
+
+    def finish(self):
+        if self.files:
+            print(f"\r{self.summary()}")
+
+def hash_job(job, algorithm, block_size):
+    """Worker entry point: partial or full hash of one (path, size, partial) job."""
+    file_path, file_size, partial = job
+    if partial:
+        return calculate_partial_hash(file_path, file_size, algorithm)
+    return calculate_hash(file_path, algorithm, block_size)
+
+def hash_files(jobs, algorithm, block_size, executor, progress):
+    """
+    Hash (path, size, partial) jobs, concurrently when an executor is given, and
+    yield (path, size, hash) in job order.
+    """
+    if executor is None:
+        hashes = (hash_job(job, algorithm, block_size) for job in jobs)
+    else:
+        chunksize = 16 if isinstance(executor, ProcessPoolExecutor) else 1
+        hashes = executor.map(hash_job, jobs, [algorithm] * len(jobs), [block_size] * len(jobs),
+                              chunksize=chunksize)
+    for (file_path, file_size, partial), file_hash in zip(jobs, hashes):
+        progress.update(min(file_size, 2 * PARTIAL_BLOCK_SIZE) if partial else file_size)
+        yield file_path, file_size, file_hash
+
+def find_duplicates(directories, algorithm='md5', skip_hardlinks=False, workers=1,
+                    block_size=DEFAULT_BLOCK_SIZE, use_processes=False, hash_cache=None):
+    """
+    Find duplicate files under one or more directories in three stages, each only
+    looking at the files still matching after the previous one: same size, then
+    same hash of the first and last blocks, then same full-content hash.
+
+    Returns {hash: (file size, [paths])} for every group of two or more files.
+
+    With workers > 1, files are hashed concurrently by a thread pool (hashlib
+    releases the GIL, so threads suit I/O-bound disks) or, with use_processes,
+    a process pool for CPU-bound hashing.
+
+    With a HashCache, files unchanged since an earlier run reuse their stored
+    hashes instead of being read again.
+    """
+    if isinstance(directories, str):
+        directories = [directories]
+    roots = normalize_roots(directories)
+    # Dictionaries to store hash -> list of files, and hash -> file size
+    hash_dict = defaultdict(list)
+    hash_sizes = {}
+
+    for directory in roots:
+        print(f"Scanning directory: {directory}")
+
+    # Step 1: Group files by size
+    signatures = None
+    if hash_cache:
+        hash_cache.load(roots)
+        signatures = {}
+    size_dict = group_by_size(roots, skip_hardlinks, signatures)
+
+    def cached_hash(file_path, partial):
+        if hash_cache:
+            return hash_cache.get(file_path, signatures[file_path], algorithm, partial)
+        return None
+
+    def store_hash(file_path, partial, file_hash):
+        if hash_cache and file_hash:
+            hash_cache.put(file_path, signatures[file_path], algorithm, partial, file_hash)
+
+    executor = None
+    if workers > 1:
+        pool_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+        executor = pool_class(max_workers=workers)
+    progress = HashProgress()
+    try:
+        # Step 2: Hash the first and last blocks of files with the same size
+        # (only process sizes shared by multiple files)
+        jobs = []
+        partial_dict = defaultdict(list)
+        for file_size, file_list in size_dict.items():
+            if len(file_list) < 2:
+                continue
+            for file_path in file_list:
+                partial_hash = cached_hash(file_path, True)
+                if partial_hash:
+                    partial_dict[(file_size, partial_hash)].append(file_path)
+                else:
+                    jobs.append((file_path, file_size, True))
+        for file_path, file_size, partial_hash in hash_files(jobs, algorithm, block_size, executor, progress):
+            store_hash(file_path, True, partial_hash)
+            if partial_hash:
+                partial_dict[(file_size, partial_hash)].append(file_path)
 
-    # Step 2: Calculate hashes for files with same size
-    for file_size, file_list in size_dict.items():
-        if len(file_list) > 1:  # Only process if multiple files have same size
+        # Step 3: Calculate full hashes for files whose partial hashes still match
+        jobs = []
+        for (file_size, partial_hash), file_list in partial_dict.items():
+            if len(file_list) < 2:
+                continue
+            if file_size <= 2 * PARTIAL_BLOCK_SIZE:
+                # The partial hash already covered the whole file
+                hash_dict[partial_hash].extend(file_list)
+                hash_sizes[partial_hash] = file_size
+                continue
             for file_path in file_list:
-                file_hash = calculate_md5(file_path)
+                file_hash = cached_hash(file_path, False)
                 if file_hash:
                     hash_dict[file_hash].append(file_path)
+                    hash_sizes[file_hash] = file_size
+                else:
+                    jobs.append((file_path, file_size, False))
+        for file_path, file_size, file_hash in hash_files(jobs, algorithm, block_size, executor, progress):
+            store_hash(file_path, False, file_hash)
+            if file_hash:
+                hash_dict[file_hash].append(file_path)
+                hash_sizes[file_hash] = file_size
+    finally:
+        if executor:
+            executor.shutdown()
+        progress.finish()
 
-    # Step 3: Collect duplicates (files with same hash)
-    duplicates = {hash_val: files for hash_val, files in hash_dict.items() if len(files) > 1}
+    if hash_cache:
+        hash_cache.save(roots, signatures)
+        print(hash_cache.summary())
+
+    # Step 4: Collect duplicates (files with same hash)
+    duplicates = {hash_val: (hash_sizes[hash_val], files)
+                  for hash_val, files in hash_dict.items() if len(files) > 1}
     return duplicates
 
 def display_duplicates(duplicates):
@@ -54,17 +355,125 @@ def display_duplicates(duplicates):
 
     total_size = 0
     print("\nDuplicate files found:")
-    for hash_val, file_list in duplicates.items():
+    for hash_val, (file_size, file_list) in duplicates.items():
         print(f"\nHash: {hash_val}")
         for i, file_path in enumerate(file_list, 1):
-            file_size = os.path.getsize(file_path)
             total_size += file_size
             print(f"  {i}. {file_path} ({file_size / 1024:.2f} KB)")
     print(f"\nTotal size of duplicates: {total_size / 1024 / 1024:.2f} MB")
     return total_size
 
+def build_report(duplicates, roots, algorithm):
+    """Build a JSON-serializable report of the duplicate groups, using the sizes found while scanning."""
+    groups = [
+        {"hash": hash_val, "size": file_size, "files": file_list}
+        for hash_val, (file_size, file_list) in duplicates.items()
+    ]
+    return {
+        "roots": roots,
+        "algorithm": algorithm,
+        "groups": groups,
+        "duplicate_files": sum(len(group["files"]) - 1 for group in groups),
+        "total_size": sum(group["size"] * len(group["files"]) for group in groups),
+        "reclaimable_size": sum(group["size"] * (len(group["files"]) - 1) for group in groups),
+    }
+
+def delete_duplicates(duplicates):
+    """Delete every duplicate, keeping the first file of each group."""
+    for hash_val, (_, file_list) in duplicates.items():
+        # Keep the first file, delete the rest
+        for file_path in file_list[1:]:
+            try:
+                os.remove(file_path)
+                print(f"Deleted: {file_path}")
+            except (OSError, PermissionError) as e:
+                print(f"Error deleting {file_path}: {e}")
+    print("Deletion complete.")
+
+def move_duplicates(duplicates, dup_folder):
+    """Move every duplicate into dup_folder, keeping the first file of each group in place."""
+    os.makedirs(dup_folder, exist_ok=True)
+
+    for hash_val, (_, file_list) in duplicates.items():
+        # Keep the first file, move the rest
+        for file_path in file_list[1:]:
+            try:
+                dest_path = os.path.join(dup_folder, os.path.basename(file_path))
+                # Handle filename conflicts
+                base, ext = os.path.splitext(dest_path)
+                counter = 1
+                while os.path.exists(dest_path):
+                    dest_path = f"{base}_{counter}{ext}"
+                    counter += 1
+                shutil.move(file_path, dest_path)
+                print(f"Moved: {file_path} -> {dest_path}")
+            except (OSError, PermissionError) as e:
+                print(f"Error moving {file_path}: {e}")
+    print(f"Moved duplicates to: {dup_folder}")
+
+# Linux ioctl cloning a whole file as a copy-on-write reflink (Btrfs, XFS, ...)
+FICLONE = 0x40049409
+
+def files_identical(path_a, path_b, block_size=DEFAULT_BLOCK_SIZE):
+    """Compare two files byte by byte."""
+    with open(path_a, 'rb') as a, open(path_b, 'rb') as b:
+        while True:
+            block_a = a.read(block_size)
+            if block_a != b.read(block_size):
+                return False
+            if not block_a:
+                return True
+
+def create_reflink(source, dest):
+    """Create dest as a copy-on-write clone of source, sharing its data blocks."""
+    if fcntl is None or not sys.platform.startswith('linux'):
+        raise OSError(errno.EOPNOTSUPP, "Reflinks are only supported on Linux")
+    with open(source, 'rb') as src, open(dest, 'xb') as dst:
+        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+
+def link_duplicates(duplicates, method='hardlink'):
+    """
+    Replace every duplicate with a hard link to (or, with method='reflink', a
+    copy-on-write clone of) the first file of its group, reclaiming the space
+    without copying any data.
+
+    Each duplicate is first compared byte by byte with the original, then the
+    link is created under a temporary name in the same directory and renamed
+    over the duplicate, so its path always refers to a complete file.
+    """
+    reclaimed = 0
+    for hash_val, (file_size, file_list) in duplicates.items():
+        original = file_list[0]
+        for file_path in file_list[1:]:
+            directory, name = os.path.split(file_path)
+            temp_path = os.path.join(directory, f".{name}.dedup-{os.getpid()}")
+            try:
+                if os.path.samefile(original, file_path):
+                    # Already a hard link (renaming a link over itself is a no-op)
+                    continue
+                if not files_identical(original, file_path):
+                    print(f"Skipped (content changed since hashing): {file_path}")
+                    continue
+                if method == 'reflink':
+                    create_reflink(original, temp_path)
+                    # A clone is a separate file, so keep the duplicate's own permissions and times
+                    shutil.copystat(file_path, temp_path)
+                else:
+                    os.link(original, temp_path)
+                os.replace(temp_path, file_path)
+                reclaimed += file_size
+                print(f"Linked: {file_path} -> {original}")
+            except (OSError, PermissionError) as e:
+                if os.path.lexists(temp_path):
+                    os.remove(temp_path)
+                if e.errno == errno.EXDEV:
+                    print(f"Error linking {file_path}: not on the same filesystem as {original}")
+                else:
+                    print(f"Error linking {file_path}: {e}")
+    print(f"Linking complete, {reclaimed / 1024 / 1024:.2f} MB reclaimed.")
+
 def handle_duplicates(duplicates, directory):
-    """Provide options to delete or move duplicate files."""
+    """Provide options to delete, move or link duplicate files."""
     if not duplicates:
         return
 
@@ -72,63 +481,118 @@ def handle_duplicates(duplicates, directory):
         print("\nOptions:")
         print("1. Delete duplicates (keep first file)")
         print("2. Move duplicates to a folder")
-        print("3. Exit")
-        choice = input("Select an option (1-3): ").strip()
+        print("3. Replace duplicates with hard links to the first file")
+        print("4. Exit")
+        choice = input("Select an option (1-4): ").strip()
 
         if choice == '1':
-            for hash_val, file_list in duplicates.items():
-                # Keep the first file, delete the rest
-                for file_path in file_list[1:]:
-                    try:
-                        os.remove(file_path)
-                        print(f"Deleted: {file_path}")
-                    except (OSError, PermissionError) as e:
-                        print(f"Error deleting {file_path}: {e}")
-            print("Deletion complete.")
+            delete_duplicates(duplicates)
             break
 
         elif choice == '2':
             # Create a folder for duplicates
-            dup_folder = os.path.join(directory, "Duplicate_Files")
-            os.makedirs(dup_folder, exist_ok=True)
-
-            for hash_val, file_list in duplicates.items():
-                # Keep the first file, move the rest
-                for file_path in file_list[1:]:
-                    try:
-                        dest_path = os.path.join(dup_folder, os.path.basename(file_path))
-                        # Handle filename conflicts
-                        base, ext = os.path.splitext(dest_path)
-                        counter = 1
-                        while os.path.exists(dest_path):
-                            dest_path = f"{base}_{counter}{ext}"
-                            counter += 1
-                        shutil.move(file_path, dest_path)
-                        print(f"Moved: {file_path} -> {dest_path}")
-                    except (OSError, PermissionError) as e:
-                        print(f"Error moving {file_path}: {e}")
-            print(f"Moved duplicates to: {dup_folder}")
+            move_duplicates(duplicates, os.path.join(directory, "Duplicate_Files"))
             break
 
         elif choice == '3':
+            link_duplicates(duplicates, 'hardlink')
+            break
+
+        elif choice == '4':
             print("Exiting without changes.")
             break
 
         else:
-            print("Invalid choice. Please select 1, 2, or 3.")
+            print("Invalid choice. Please select 1, 2, 3, or 4.")
+
+def run_action(duplicates, action, move_to):
+    """Apply a --action to the duplicates without prompting."""
+    if not duplicates or action == 'report':
+        return
+    if action == 'delete':
+        delete_duplicates(duplicates)
+    elif action == 'move':
+        move_duplicates(duplicates, move_to)
+    elif action in ('hardlink', 'reflink'):
+        link_duplicates(duplicates, action)
+
+def positive_int(value):
+    """argparse type for options that must be at least 1."""
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got {value}")
+    return number
+
+def parse_arguments():
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description="Find duplicate files by content")
+    parser.add_argument('directories', nargs='*',
+                        help="Directories to scan together; prompts interactively when omitted")
+    parser.add_argument('--action', choices=['report', 'delete', 'move', 'hardlink', 'reflink'],
+                        help="What to do with duplicates without prompting (default with directories: report)")
+    parser.add_argument('--move-to', metavar='DIR',
+                        help="Destination for --action move (default: Duplicate_Files in the first directory)")
+    parser.add_argument('--json', metavar='FILE', help="Write a JSON report of the duplicates to FILE ('-' for stdout)")
+    parser.add_argument('--hash', choices=sorted(HASH_ALGORITHMS), default='md5',
+                        help="Hash algorithm used to compare file contents (default: md5)")
+    parser.add_argument('--skip-hardlinks', action='store_true',
+                        help="Treat hard links to the same inode as one file instead of duplicates")
+    parser.add_argument('--workers', type=positive_int, default=1,
+                        help="Number of files hashed concurrently (default: 1)")
+    parser.add_argument('--processes', action='store_true',
+                        help="Hash in worker processes instead of threads (for CPU-bound hashing)")
+    parser.add_argument('--block-size', type=positive_int, default=DEFAULT_BLOCK_SIZE // 1024, metavar='KB',
+                        help="Read size when hashing whole files, in KiB (default: 1024)")
+    parser.add_argument('--cache', metavar='FILE',
+                        help="Store hashes in an SQLite cache and reuse them for unchanged files on later runs")
+    return parser.parse_args()
 
 def main():
     """Main function to run the duplicate file finder."""
-    directory = input("Enter the directory path to scan: ").strip()
-    
-    if not os.path.isdir(directory):
-        print("Invalid directory path.")
-        return
+    args = parse_arguments()
+    interactive = not args.directories
+    if interactive:
+        directories = [input("Enter the directory path to scan: ").strip()]
+    else:
+        directories = args.directories
+
+    invalid = [directory for directory in directories if not os.path.isdir(directory)]
+    if invalid:
+        print(f"Invalid directory path: {', '.join(invalid)}")
+        return 2
 
-    duplicates = find_duplicates(directory)
-    total_size = display_duplicates(duplicates)
-    if total_size > 0:
-        handle_duplicates(duplicates, directory)
+    # With the JSON report on stdout, progress and action messages go to stderr
+    json_stdout = args.json == '-'
+    with redirect_stdout(sys.stderr) if json_stdout else nullcontext():
+        hash_cache = HashCache(args.cache) if args.cache else None
+        try:
+            duplicates = find_duplicates(directories, args.hash, args.skip_hardlinks, args.workers,
+                                         args.block_size * 1024, args.processes, hash_cache)
+        finally:
+            if hash_cache:
+                hash_cache.close()
+
+    if args.json:
+        report = build_report(duplicates, normalize_roots(directories), args.hash)
+        if json_stdout:
+            print(json.dumps(report, indent=4))
+        else:
+            with open(args.json, 'w') as f:
+                json.dump(report, f, indent=4)
+            print(f"Wrote report to {args.json}")
+    else:
+        display_duplicates(duplicates)
+
+    with redirect_stdout(sys.stderr) if json_stdout else nullcontext():
+        if interactive and not args.action:
+            handle_duplicates(duplicates, directories[0])
+        else:
+            move_to = args.move_to or os.path.join(directories[0], "Duplicate_Files")
+            run_action(duplicates, args.action or 'report', move_to)
+    return 0
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
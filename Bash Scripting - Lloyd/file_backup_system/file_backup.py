@@ -1,6 +1,9 @@
 import os
 import shutil
 import zipfile
+import zlib
+import hashlib
+import json
 import schedule
 import time
 import datetime
@@ -15,6 +18,10 @@ logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 
+# Files are split into chunks of this size for the incremental store, so an
+# appended or partly changed large file only stores its new chunks
+CHUNK_SIZE = 4 * 1024 * 1024
+
 class BackupManager:
     def __init__(self, source_dir, dest_dir, compress=False):
         self.source_dir = Path(source_dir)
@@ -86,6 +93,152 @@ class BackupManager:
             logging.error(f"Partial backup failed: {str(e)}")
             raise
 
+    # --- Incremental Backups ---
+    # Layout under dest_dir:
+    #   store/objects/ab/abcd...   file chunks, named by the SHA-256 of their content
+    #   store/snapshots/<id>.json  manifest of one run: every file and its chunks
+    @property
+    def store_dir(self):
+        return self.dest_dir / "store"
+
+    def _object_path(self, chunk_hash, compressed):
+        suffix = ".z" if compressed else ""
+        return self.store_dir / "objects" / chunk_hash[:2] / f"{chunk_hash}{suffix}"
+
+    def _write_object(self, chunk_hash, data):
+        """Store a chunk unless an identical one is already stored. Returns True if it was new."""
+        if any(self._object_path(chunk_hash, compressed).exists() for compressed in (False, True)):
+            return False
+        object_path = self._object_path(chunk_hash, self.compress)
+        object_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = object_path.with_name(f"{object_path.name}.tmp")
+        with open(temp_path, 'wb') as f:
+            f.write(zlib.compress(data) if self.compress else data)
+        os.replace(temp_path, object_path)
+        return True
+
+    def _read_object(self, chunk_hash):
+        """Read a chunk, stored compressed or not, and check it against its hash."""
+        for compressed in (False, True):
+            object_path = self._object_path(chunk_hash, compressed)
+            if object_path.exists():
+                data = object_path.read_bytes()
+                data = zlib.decompress(data) if compressed else data
+                if hashlib.sha256(data).hexdigest() != chunk_hash:
+                    raise ValueError(f"Backup object {object_path} is corrupt")
+                return data
+        raise FileNotFoundError(f"Backup object {chunk_hash} is missing")
+
+    def list_snapshots(self):
+        """Snapshot ids of the incremental store, oldest first."""
+        snapshots_dir = self.store_dir / "snapshots"
+        if not snapshots_dir.exists():
+            return []
+        return sorted(path.stem for path in snapshots_dir.glob("*.json"))
+
+    def load_manifest(self, snapshot_id):
+        """Load a snapshot's manifest; 'latest' selects the most recent one."""
+        if snapshot_id == "latest":
+            snapshots = self.list_snapshots()
+            if not snapshots:
+                raise ValueError(f"No snapshots in {self.store_dir}")
+            snapshot_id = snapshots[-1]
+        manifest_path = self.store_dir / "snapshots" / f"{snapshot_id}.json"
+        if not manifest_path.exists():
+            raise ValueError(f"Snapshot {snapshot_id} does not exist in {self.store_dir}")
+        with open(manifest_path) as f:
+            return json.load(f)
+
+    def _store_file(self, file_path):
+        """Split a file into chunks, store the new ones and return (chunk hashes, bytes stored)."""
+        chunks = []
+        stored = 0
+        with open(file_path, 'rb') as f:
+            for data in iter(lambda: f.read(CHUNK_SIZE), b''):
+                chunk_hash = hashlib.sha256(data).hexdigest()
+                if self._write_object(chunk_hash, data):
+                    stored += len(data)
+                chunks.append(chunk_hash)
+        return chunks, stored
+
+    def incremental_backup(self):
+        """
+        Back up the source directory into the content-addressed store and write
+        a manifest for this run.
+
+        Files whose size and mtime match the previous snapshot reuse its chunk
+        list without being read. Other files are chunked and hashed, and only
+        chunks not already in the store are written, so unchanged data (and
+        identical files anywhere in any snapshot) is stored once.
+        """
+        self.validate_paths()
+        snapshots = self.list_snapshots()
+        previous = self.load_manifest(snapshots[-1])["files"] if snapshots else {}
+        snapshot_id = self.backup_time
+        counter = 1
+        while snapshot_id in snapshots:
+            snapshot_id = f"{self.backup_time}_{counter}"
+            counter += 1
+
+        files = {}
+        reused = hashed = stored_bytes = 0
+        try:
+            logging.info(f"Creating incremental backup {snapshot_id} in {self.store_dir}")
+            for root, _, names in os.walk(self.source_dir):
+                for name in names:
+                    file_path = Path(root) / name
+                    rel_path = file_path.relative_to(self.source_dir).as_posix()
+                    stat = file_path.stat()
+                    entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "mode": stat.st_mode & 0o7777}
+                    old = previous.get(rel_path)
+                    if old and old["size"] == stat.st_size and old["mtime_ns"] == stat.st_mtime_ns:
+                        entry["chunks"] = old["chunks"]
+                        reused += 1
+                    else:
+                        entry["chunks"], stored = self._store_file(file_path)
+                        stored_bytes += stored
+                        hashed += 1
+                    files[rel_path] = entry
+
+            manifest = {
+                "snapshot": snapshot_id,
+                "created": datetime.datetime.now().isoformat(timespec='seconds'),
+                "source": str(self.source_dir.resolve()),
+                "chunk_size": CHUNK_SIZE,
+                "files": files,
+            }
+            manifest_path = self.store_dir / "snapshots" / f"{snapshot_id}.json"
+            manifest_path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = manifest_path.with_suffix(".tmp")
+            with open(temp_path, 'w') as f:
+                json.dump(manifest, f)
+            os.replace(temp_path, manifest_path)
+            logging.info(f"Incremental backup completed: {snapshot_id} ({len(files)} files, {reused} unchanged, "
+                         f"{hashed} read, {stored_bytes / 1024 / 1024:.2f} MB of new data stored)")
+            return snapshot_id
+        except Exception as e:
+            logging.error(f"Incremental backup failed: {str(e)}")
+            raise
+
+    def restore(self, snapshot_id, target_dir):
+        """Restore every file of a snapshot into target_dir, with its mode and mtime."""
+        manifest = self.load_manifest(snapshot_id)
+        target_dir = Path(target_dir)
+        try:
+            logging.info(f"Restoring snapshot {manifest['snapshot']} to {target_dir}")
+            for rel_path, entry in manifest["files"].items():
+                file_path = target_dir / rel_path
+                file_path.parent.mkdir(parents=True, exist_ok=True)
+                with open(file_path, 'wb') as f:
+                    for chunk_hash in entry["chunks"]:
+                        f.write(self._read_object(chunk_hash))
+                os.chmod(file_path, entry["mode"])
+                os.utime(file_path, ns=(entry["mtime_ns"], entry["mtime_ns"]))
+            logging.info(f"Restore completed: {len(manifest['files'])} files to {target_dir}")
+        except Exception as e:
+            logging.error(f"Restore failed: {str(e)}")
+            raise
+
     def _should_backup_file(self, file_path, file_extensions, modified_after):
         """Determine if a file should be backed up based on criteria."""
         if file_extensions and file_path.suffix.lower() not in [ext.lower() for ext in file_extensions]:
@@ -99,12 +252,20 @@ class BackupManager:
     @staticmethod
     def schedule_backup(backup_type, source_dir, dest_dir, compress, interval, file_extensions=None):
         """Schedule a backup to run at specified intervals."""
+        last_run = None
+
         def job():
+            nonlocal last_run
+            started = datetime.datetime.now()
             backup = BackupManager(source_dir, dest_dir, compress)
             if backup_type == "full":
                 backup.full_backup()
+            elif backup_type == "incremental":
+                backup.incremental_backup()
             else:
-                backup.partial_backup(file_extensions=file_extensions)
+                # Only files changed since the previous scheduled run
+                backup.partial_backup(file_extensions=file_extensions, modified_after=last_run)
+            last_run = started
         
         if interval == "daily":
             schedule.every().day.at("02:00").do(job)
@@ -123,19 +284,31 @@ def parse_arguments():
     parser = argparse.ArgumentParser(description="File Backup Utility")
     parser.add_argument("source", help="Source directory to back up")
     parser.add_argument("destination", help="Destination directory for backups")
-    parser.add_argument("--type", choices=["full", "partial"], default="full", 
-                       help="Backup type (full or partial)")
+    parser.add_argument("--type", choices=["full", "partial", "incremental"], default="full",
+                       help="Backup type (full, partial or incremental)")
     parser.add_argument("--compress", action="store_true", help="Compress backup")
     parser.add_argument("--extensions", nargs="*", help="File extensions for partial backup (e.g., .txt .doc)")
     parser.add_argument("--schedule", choices=["hourly", "daily", "weekly"], 
                        help="Schedule backup interval")
+    parser.add_argument("--list-snapshots", action="store_true",
+                        help="List the incremental snapshots in the destination")
+    parser.add_argument("--restore", metavar="SNAPSHOT",
+                        help="Restore an incremental snapshot (or 'latest') from the destination")
+    parser.add_argument("--restore-to", metavar="DIR",
+                        help="Directory to restore into (default: the source directory)")
     return parser.parse_args()
 
 def main():
     args = parse_arguments()
     
     try:
-        if args.schedule:
+        if args.list_snapshots:
+            for snapshot_id in BackupManager(args.source, args.destination).list_snapshots():
+                print(snapshot_id)
+        elif args.restore:
+            backup = BackupManager(args.source, args.destination)
+            backup.restore(args.restore, args.restore_to or args.source)
+        elif args.schedule:
             BackupManager.schedule_backup(
                 backup_type=args.type,
                 source_dir=args.source,
@@ -148,6 +321,8 @@ def main():
             backup = BackupManager(args.source, args.destination, args.compress)
             if args.type == "full":
                 backup.full_backup()
+            elif args.type == "incremental":
+                backup.incremental_backup()
             else:
                 backup.partial_backup(file_extensions=args.extensions)
     except Exception as e:
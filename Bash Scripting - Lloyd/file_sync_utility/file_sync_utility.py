@@ -1,9 +1,17 @@
 import os
+import argparse
+import errno
 import time
 import hashlib
 import json
 import shutil
 import logging
+import queue
+import sqlite3
+import threading
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 
@@ -16,67 +24,524 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Metadata file of earlier versions, migrated into the SQLite store on first run
+LEGACY_METADATA_FILE = "sync_metadata.json"
+# Bytes read at a time when hashing, so large files are never held in memory
+HASH_BLOCK_SIZE = 1024 * 1024
+# Block size for delta transfers, and the smallest file worth updating in place
+DELTA_BLOCK_SIZE = 1024 * 1024
+DELTA_MIN_SIZE = 16 * 1024 * 1024
+# Errors meaning copy_file_range cannot be used for this pair of files
+COPY_FALLBACK_ERRORS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF}
+
+
+def fast_copy(src_path, dest_path):
+    """
+    Copy a file's data in the kernel with os.copy_file_range, which can also use
+    reflinks or server-side copies. Falls back to shutil.copyfile (os.sendfile
+    on Linux) where copy_file_range is unavailable.
+    """
+    if hasattr(os, 'copy_file_range'):
+        try:
+            with open(src_path, 'rb') as src, open(dest_path, 'wb') as dest:
+                while os.copy_file_range(src.fileno(), dest.fileno(), 1 << 30):
+                    pass
+            return
+        except OSError as e:
+            if e.errno not in COPY_FALLBACK_ERRORS:
+                raise
+    shutil.copyfile(src_path, dest_path)
+
+
+def block_signature(block):
+    """rsync-style (weak, strong) checksum pair of a block: Adler-32 and a 128-bit BLAKE2b."""
+    return [zlib.adler32(block), hashlib.blake2b(block, digest_size=16).hexdigest()]
+
+
+def delta_copy(src_path, dest_path, signatures=None, block_size=DELTA_BLOCK_SIZE):
+    """
+    Update dest_path in place to match src_path, rewriting only the blocks that
+    differ. With `signatures` (the stored block checksums of dest_path), the
+    destination is not read at all; otherwise its blocks are compared directly.
+
+    Returns the new block signatures and the number of blocks written.
+    """
+    new_signatures = []
+    written = 0
+    with open(src_path, 'rb') as src, open(dest_path, 'r+b') as dest:
+        offset = 0
+        for index, block in enumerate(iter(lambda: src.read(block_size), b'')):
+            signature = block_signature(block)
+            if signatures is not None:
+                # Both checksums are already computed for the new signatures, so
+                # the pair is compared as a whole; the weak one adds no savings here
+                same = (index < len(signatures) and signatures[index][0] == signature[0]
+                        and signatures[index][1] == signature[1])
+            else:
+                dest.seek(offset)
+                same = dest.read(len(block)) == block
+            if not same:
+                dest.seek(offset)
+                dest.write(block)
+                written += 1
+            new_signatures.append(signature)
+            offset += len(block)
+        dest.truncate(offset)
+    return new_signatures, written
+
+
+class EventQueue:
+    """
+    Pending file events, coalesced per path. A path's events are released only
+    after it has had no new event for `debounce` seconds, so the burst of events
+    from one editor save or a file still being copied is applied once.
+    """
+
+    def __init__(self, debounce=0.5):
+        self.debounce = debounce
+        self._events = OrderedDict()  # path -> (kind, time of last event), oldest first
+        self._condition = threading.Condition()
+        self._closed = False
+
+    def __len__(self):
+        with self._condition:
+            return len(self._events)
+
+    def put(self, kind, path):
+        with self._condition:
+            previous = self._events.pop(path, None)
+            if previous and previous[0] == 'created' and kind == 'modified':
+                # Still a new file as far as the other folder is concerned
+                kind = 'created'
+            self._events[path] = (kind, time.monotonic())
+            self._condition.notify()
+
+    def get_ready(self, timeout):
+        """Wait up to `timeout` seconds for events that are past the debounce window."""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                ready = []
+                oldest = None
+                for path, (kind, last_event) in self._events.items():
+                    if now - last_event < self.debounce:
+                        oldest = last_event
+                        break
+                    ready.append((kind, path))
+                for _, path in ready:
+                    del self._events[path]
+                if ready or now >= deadline or self._closed:
+                    return ready
+                wait = deadline - now
+                if oldest is not None:
+                    wait = min(wait, self.debounce - (now - oldest))
+                self._condition.wait(wait)
+
+    def close(self):
+        """Make get_ready return immediately from now on."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def drain(self):
+        """Remove and return every pending event, ready or not."""
+        with self._condition:
+            events = [(kind, path) for path, (kind, _) in self._events.items()]
+            self._events.clear()
+            return events
+
+
+def copy_file(src_path, dest_path, blocks, delta=True, delta_min_size=DELTA_MIN_SIZE,
+              block_size=DELTA_BLOCK_SIZE):
+    """
+    Copy src_path's content and times to dest_path, like shutil.copy2: large
+    files that already exist are delta-updated, everything else is copied in
+    the kernel. `blocks` is the metadata section holding block signatures.
+
+    Returns the number of bytes written.
+    """
+    dest_key = os.path.abspath(dest_path)
+    try:
+        dest_stat = os.stat(dest_path)
+    except FileNotFoundError:
+        dest_stat = None
+    src_size = os.path.getsize(src_path)
+    if not (delta and dest_stat and src_size >= delta_min_size):
+        fast_copy(src_path, dest_path)
+        shutil.copystat(src_path, dest_path)
+        blocks.pop(dest_key, None)
+        return src_size
+
+    stored = blocks.get(dest_key)
+    signatures = None
+    # Stored signatures are only trusted while the destination is unchanged
+    if (stored and stored['block_size'] == block_size and stored['size'] == dest_stat.st_size
+            and stored['mtime_ns'] == dest_stat.st_mtime_ns):
+        signatures = stored['sums']
+    signatures, written = delta_copy(src_path, dest_path, signatures, block_size)
+    # Match copy2: the destination takes the source's times and permissions
+    shutil.copystat(src_path, dest_path)
+    dest_stat = os.stat(dest_path)
+    blocks[dest_key] = {
+        "block_size": block_size, "size": dest_stat.st_size,
+        "mtime_ns": dest_stat.st_mtime_ns, "sums": signatures,
+    }
+    logger.info(f"Delta sync rewrote {written} of {len(signatures)} blocks of {dest_path}")
+    return written * block_size
+
+
+class MetadataView:
+    """Dict-like access to one section of a MetadataStore: 'a', 'b' or 'blocks'."""
+
+    def __init__(self, store, section):
+        self.store = store
+        self.section = section
+
+    def get(self, key, default=None):
+        value = self.store.get(self.section, key)
+        return default if value is None else value
+
+    def __contains__(self, key):
+        return self.store.get(self.section, key) is not None
+
+    def __setitem__(self, key, value):
+        self.store.set(self.section, key, value)
+
+    def pop(self, key, default=None):
+        value = self.get(key, default)
+        self.store.set(self.section, key, None)
+        return value
+
+    def pop_subtree(self, directory):
+        """Remove every key under a directory path."""
+        self.store.delete_subtree(self.section, directory)
+
+
+class MetadataStore:
+    """
+    Sync metadata in an SQLite database in WAL mode: one row per file and side,
+    plus the block signatures of large files, looked up by primary key.
+
+    Changes are buffered in memory (lookups see them immediately) and written
+    in a single transaction by commit(), so saving costs one upsert or delete
+    per changed path rather than a rewrite of everything.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        # Used from the event worker and initial sync threads, always under _lock
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS files (
+                    side TEXT NOT NULL,
+                    path TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER,
+                    timestamp REAL NOT NULL,
+                    hash TEXT NOT NULL,
+                    PRIMARY KEY (side, path)
+                ) WITHOUT ROWID
+            """)
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS blocks (
+                    path TEXT PRIMARY KEY,
+                    block_size INTEGER NOT NULL,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    sums TEXT NOT NULL
+                )
+            """)
+        self._lock = threading.Lock()
+        self._pending = {}  # (section, key) -> value, None for a deletion
+
+    def __getitem__(self, section):
+        return MetadataView(self, section)
+
+    def get(self, section, key):
+        with self._lock:
+            if (section, key) in self._pending:
+                return self._pending[(section, key)]
+            if section == 'blocks':
+                row = self.conn.execute(
+                    "SELECT block_size, size, mtime_ns, sums FROM blocks WHERE path = ?", (key,)
+                ).fetchone()
+                if row:
+                    return {"block_size": row[0], "size": row[1], "mtime_ns": row[2], "sums": json.loads(row[3])}
+                return None
+            row = self.conn.execute(
+                "SELECT size, mtime_ns, timestamp, hash FROM files WHERE side = ? AND path = ?", (section, key)
+            ).fetchone()
+        if row is None:
+            return None
+        metadata = {"timestamp": row[2], "size": row[0], "hash": row[3]}
+        if row[1] is not None:
+            metadata["mtime_ns"] = row[1]
+        return metadata
+
+    def set(self, section, key, value):
+        with self._lock:
+            self._pending[(section, key)] = value
+
+    def delete_subtree(self, section, directory):
+        """Buffer the deletion of every key of a section under directory."""
+        # Keys sorting between "directory/" and "directory0" ('0' follows '/')
+        prefix = directory.rstrip(os.sep) + os.sep
+        end = prefix[:-1] + chr(ord(os.sep) + 1)
+        with self._lock:
+            if section == 'blocks':
+                rows = self.conn.execute("SELECT path FROM blocks WHERE path >= ? AND path < ?", (prefix, end))
+            else:
+                rows = self.conn.execute("SELECT path FROM files WHERE side = ? AND path >= ? AND path < ?",
+                                         (section, prefix, end))
+            keys = {row[0] for row in rows}
+            keys.update(key for pending_section, key in self._pending
+                        if pending_section == section and key.startswith(prefix))
+            for key in keys:
+                self._pending[(section, key)] = None
+
+    def commit(self):
+        """Write all buffered changes in one transaction."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            if not pending:
+                return
+            file_rows, block_rows, file_deletes, block_deletes = [], [], [], []
+            for (section, key), value in pending.items():
+                if section == 'blocks':
+                    if value is None:
+                        block_deletes.append((key,))
+                    else:
+                        block_rows.append((key, value['block_size'], value['size'], value['mtime_ns'],
+                                           json.dumps(value['sums'])))
+                elif value is None:
+                    file_deletes.append((section, key))
+                else:
+                    file_rows.append((section, key, value['size'], value.get('mtime_ns'),
+                                      value['timestamp'], value['hash']))
+            with self.conn:
+                self.conn.executemany("DELETE FROM files WHERE side = ? AND path = ?", file_deletes)
+                self.conn.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)", file_rows)
+                self.conn.executemany("DELETE FROM blocks WHERE path = ?", block_deletes)
+                self.conn.executemany("INSERT OR REPLACE INTO blocks VALUES (?, ?, ?, ?, ?)", block_rows)
+
+    def migrate_json(self, json_file):
+        """
+        Import metadata from the JSON file used by earlier versions, then rename
+        it to <json_file>.migrated so the import only ever happens once.
+        """
+        with open(json_file, 'r') as f:
+            legacy = json.load(f)
+        for section in ('a', 'b', 'blocks'):
+            for key, value in legacy.get(section, {}).items():
+                if value:
+                    self.set(section, key, value)
+        self.commit()
+        os.replace(json_file, f"{json_file}.migrated")
+        logger.info(f"Migrated sync metadata from {json_file} to {self.db_path}")
+
+    def close(self):
+        self.commit()
+        with self._lock:
+            self.conn.close()
+
 
 class SyncHandler(FileSystemEventHandler):
-    def __init__(self, folder_a, folder_b, metadata_file="sync_metadata.json"):
+    def __init__(self, folder_a, folder_b, metadata_file="sync_metadata.db",
+                 debounce=0.5, flush_interval=2.0, batch_size=1000, delta=True,
+                 delta_min_size=DELTA_MIN_SIZE, block_size=DELTA_BLOCK_SIZE):
         self.folder_a = os.path.abspath(folder_a)
         self.folder_b = os.path.abspath(folder_b)
         self.metadata_file = metadata_file
         self.metadata = self._load_metadata()
+        # Files of at least delta_min_size that already exist at the destination
+        # are updated in place, block by block
+        self.delta = delta
+        self.delta_min_size = delta_min_size
+        self.block_size = block_size
+        self.events = EventQueue(debounce)
+        # The metadata file is saved after batch_size events or flush_interval
+        # seconds, whichever comes first, and whenever the queue empties
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._unsaved_events = 0
+        self._last_flush = time.monotonic()
+        self._stop_event = threading.Event()
+        self._worker = None
+        # path -> ((size, mtime_ns, inode), metadata); unchanged files are not rehashed
+        self._hash_cache = {}
+        self._cache_lock = threading.Lock()
 
     def _load_metadata(self):
-        try:
-            with open(self.metadata_file, 'r') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return {"a": {}, "b": {}}
+        store = MetadataStore(self.metadata_file)
+        # Carry over the sync_metadata.json written by earlier versions
+        legacy_file = os.path.join(os.path.dirname(self.metadata_file), LEGACY_METADATA_FILE)
+        if os.path.exists(legacy_file):
+            store.migrate_json(legacy_file)
+        return store
 
     def _save_metadata(self):
-        with open(self.metadata_file, 'w') as f:
-            json.dump(self.metadata, f, indent=4)
+        self.metadata.commit()
+
+    @staticmethod
+    def _stat_key(stat):
+        return (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+
+    @staticmethod
+    def _stat_metadata(stat, file_hash):
+        return {"timestamp": stat.st_mtime, "mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "hash": file_hash}
+
+    def _remember(self, filepath, stat, metadata):
+        """Cache metadata known to describe the file as of `stat`."""
+        metadata = self._stat_metadata(stat, metadata['hash'])
+        with self._cache_lock:
+            self._hash_cache[os.path.abspath(filepath)] = (self._stat_key(stat), metadata)
+        return dict(metadata)
+
+    @staticmethod
+    def _hash_file(filepath):
+        """SHA-256 of a file, read in HASH_BLOCK_SIZE chunks."""
+        sha256 = hashlib.sha256()
+        with open(filepath, 'rb') as f:
+            for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+                sha256.update(block)
+        return sha256.hexdigest()
 
     def _get_file_metadata(self, filepath):
+        """
+        Return the file's timestamp, size and SHA-256 hash. The hash is only
+        computed when the file's (size, mtime_ns, inode) differ from the last
+        time it was seen.
+        """
+        filepath = os.path.abspath(filepath)
         try:
-            timestamp = os.path.getmtime(filepath)
-            size = os.path.getsize(filepath)
-            with open(filepath, 'rb') as f:
-                file_hash = hashlib.sha256(f.read()).hexdigest()
-            return {"timestamp": timestamp, "size": size, "hash": file_hash}
+            stat = os.stat(filepath)
+            key = self._stat_key(stat)
+            with self._cache_lock:
+                cached = self._hash_cache.get(filepath)
+            if cached and cached[0] == key:
+                return dict(cached[1])
+            metadata = self._stat_metadata(stat, self._hash_file(filepath))
+            with self._cache_lock:
+                self._hash_cache[filepath] = (key, metadata)
+            return dict(metadata)
         except FileNotFoundError:
+            with self._cache_lock:
+                self._hash_cache.pop(filepath, None)
             return None
 
+    def _forget(self, filepath):
+        with self._cache_lock:
+            self._hash_cache.pop(os.path.abspath(filepath), None)
+
+    def _copy_data(self, src_path, dest_path):
+        copy_file(src_path, dest_path, self.metadata['blocks'], self.delta, self.delta_min_size, self.block_size)
+
     def _sync_file(self, src_path, dest_path):
         try:
             os.makedirs(os.path.dirname(dest_path), exist_ok=True)
-            shutil.copy2(src_path, dest_path)
+            src_meta = self._get_file_metadata(src_path)
+            with self._cache_lock:
+                src_key = self._hash_cache.get(os.path.abspath(src_path), (None,))[0]
+            self._copy_data(src_path, dest_path)
             logger.info(f"Synced: {src_path} -> {dest_path}")
+            # The copy has the source's content, so record its hash for the
+            # destination too, unless the source changed during the copy
+            if src_meta and self._stat_key(os.stat(src_path)) == src_key:
+                self._remember(dest_path, os.stat(dest_path), src_meta)
         except Exception as e:
             logger.error(f"Error syncing {src_path} to {dest_path}: {e}")
 
+    # --- Event Handling ---
+    # The watchdog observer threads only queue events; a worker thread applies
+    # them once each path has been quiet for `debounce` seconds.
     def on_created(self, event):
-        if event.is_directory:
+        if not event.is_directory:
+            self.events.put('created', os.path.abspath(event.src_path))
+
+    def on_deleted(self, event):
+        if not event.is_directory:
+            self.events.put('deleted', os.path.abspath(event.src_path))
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.events.put('modified', os.path.abspath(event.src_path))
+
+    def start(self):
+        """Start the worker thread applying queued events."""
+        self._stop_event.clear()
+        self._worker = threading.Thread(target=self._run, name="sync-worker", daemon=True)
+        self._worker.start()
+
+    def stop(self):
+        """Stop the worker, apply any events still queued and save the metadata."""
+        self._stop_event.set()
+        self.events.close()
+        if self._worker:
+            self._worker.join()
+        self._process(self.events.drain())
+        self._flush_metadata(force=True)
+        self.metadata.close()
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            events = self.events.get_ready(timeout=self.flush_interval)
+            self._process(events)
+            self._flush_metadata(force=not self.events)
+
+    def _process(self, events):
+        handlers = {'created': self._handle_created, 'deleted': self._handle_deleted,
+                    'modified': self._handle_modified}
+        for kind, src_path in events:
+            try:
+                handlers[kind](src_path)
+            except Exception as e:
+                logger.error(f"Error handling {kind} event for {src_path}: {e}")
+            self._unsaved_events += 1
+
+    def _flush_metadata(self, force=False):
+        """Save the metadata once enough events or time have accumulated since the last save."""
+        if not self._unsaved_events:
             return
-        src_path = os.path.abspath(event.src_path)
+        if (force or self._unsaved_events >= self.batch_size
+                or time.monotonic() - self._last_flush >= self.flush_interval):
+            self._save_metadata()
+            self._unsaved_events = 0
+            self._last_flush = time.monotonic()
+
+    def _in_sync(self, src_path, dest_path):
+        """True if dest_path already has src_path's content, e.g. for the event our own copy caused."""
+        dest_meta = self._get_file_metadata(dest_path)
+        if not dest_meta:
+            return False
+        src_meta = self._get_file_metadata(src_path)
+        return bool(src_meta) and src_meta['hash'] == dest_meta['hash']
+
+    def _handle_created(self, src_path):
         if src_path.startswith(self.folder_a):
             rel_path = os.path.relpath(src_path, self.folder_a)
             dest_path = os.path.join(self.folder_b, rel_path)
-            self._sync_file(src_path, dest_path)
+            if not self._in_sync(src_path, dest_path):
+                self._sync_file(src_path, dest_path)
             self.metadata['b'][rel_path] = self._get_file_metadata(dest_path)
         elif src_path.startswith(self.folder_b):
             rel_path = os.path.relpath(src_path, self.folder_b)
             dest_path = os.path.join(self.folder_a, rel_path)
-            self._sync_file(src_path, dest_path)
+            if not self._in_sync(src_path, dest_path):
+                self._sync_file(src_path, dest_path)
             self.metadata['a'][rel_path] = self._get_file_metadata(dest_path)
-        self._save_metadata()
 
-    def on_deleted(self, event):
-        if event.is_directory:
-            return
-        src_path = os.path.abspath(event.src_path)
+    def _handle_deleted(self, src_path):
         if src_path.startswith(self.folder_a):
             rel_path = os.path.relpath(src_path, self.folder_a)
             if rel_path in self.metadata['a']:
                 dest_path = os.path.join(self.folder_b, rel_path)
+                self._forget(src_path)
+                self._forget(dest_path)
+                self.metadata['blocks'].pop(dest_path, None)
                 try:
                     os.remove(dest_path)
                     logger.info(f"Deleted: {dest_path}")
@@ -90,6 +555,9 @@ class SyncHandler(FileSystemEventHandler):
             rel_path = os.path.relpath(src_path, self.folder_b)
             if rel_path in self.metadata['b']:
                 dest_path = os.path.join(self.folder_a, rel_path)
+                self._forget(src_path)
+                self._forget(dest_path)
+                self.metadata['blocks'].pop(dest_path, None)
                 try:
                     os.remove(dest_path)
                     logger.info(f"Deleted: {dest_path}")
@@ -99,15 +567,16 @@ class SyncHandler(FileSystemEventHandler):
                     logger.error(f"Error deleting {dest_path}: {e}")
                 self.metadata['a'].pop(rel_path, None)
                 self.metadata['b'].pop(rel_path, None)
-        self._save_metadata()
 
-    def on_modified(self, event):
-        if event.is_directory:
-            return
-        src_path = os.path.abspath(event.src_path)
+    def _handle_modified(self, src_path):
         if src_path.startswith(self.folder_a):
             rel_path = os.path.relpath(src_path, self.folder_a)
             dest_path = os.path.join(self.folder_b, rel_path)
+            if self._in_sync(src_path, dest_path):
+                # Nothing to do, e.g. the event for a copy we just made
+                self.metadata['a'][rel_path] = self._get_file_metadata(src_path)
+                self.metadata['b'][rel_path] = self._get_file_metadata(dest_path)
+                return
             current_meta_a = self._get_file_metadata(src_path)
             stored_meta_b = self.metadata['b'].get(rel_path)
             if stored_meta_b:
@@ -127,6 +596,11 @@ class SyncHandler(FileSystemEventHandler):
         elif src_path.startswith(self.folder_b):
             rel_path = os.path.relpath(src_path, self.folder_b)
             dest_path = os.path.join(self.folder_a, rel_path)
+            if self._in_sync(src_path, dest_path):
+                # Nothing to do, e.g. the event for a copy we just made
+                self.metadata['b'][rel_path] = self._get_file_metadata(src_path)
+                self.metadata['a'][rel_path] = self._get_file_metadata(dest_path)
+                return
             current_meta_b = self._get_file_metadata(src_path)
             stored_meta_a = self.metadata['a'].get(rel_path)
             if stored_meta_a:
@@ -143,7 +617,6 @@ class SyncHandler(FileSystemEventHandler):
             elif current_meta_b:
                 self._sync_file(src_path, dest_path)
                 self.metadata['a'][rel_path] = current_meta_b
-        self._save_metadata()
 
     def _handle_conflict(self, file_a, file_b):
         logger.warning(f"Conflict detected for: {os.path.basename(file_a)}")
@@ -161,54 +634,448 @@ class SyncHandler(FileSystemEventHandler):
             logger.error(f"Error handling conflict for {file_b}: {e}")
 
 
-def initial_sync(folder_a, folder_b, handler):
+def _scan_folder(folder):
+    """Map the relative path of every file under folder to its os.stat result."""
+    files = {}
+    for root, _, names in os.walk(folder):
+        for name in names:
+            path = os.path.join(root, name)
+            try:
+                files[os.path.relpath(path, folder)] = os.stat(path)
+            except FileNotFoundError:
+                pass
+    return files
+
+
+def _known_metadata(handler, side, rel_path, path, stat):
+    """Stored metadata for a file whose size and mtime still match, or None if it may have changed."""
+    stored = handler.metadata[side].get(rel_path)
+    if not stored or not stored.get('hash') or stored.get('size') != stat.st_size:
+        return None
+    if 'mtime_ns' in stored:
+        unchanged = stored['mtime_ns'] == stat.st_mtime_ns
+    else:
+        unchanged = stored.get('timestamp') == stat.st_mtime
+    return handler._remember(path, stat, stored) if unchanged else None
+
+
+def plan_initial_sync(folder_a, folder_b, handler):
+    """
+    Compare both folders in one pass and return the copies needed to bring them
+    in sync as (src_path, dest_path, rel_path, src_side, dest_side) tuples.
+
+    Files with the same size and mtime on both sides are taken to be in sync
+    (copies keep the source's mtime), and their stored hashes are reused when
+    they still match. Only files of equal size but different mtimes are hashed
+    (unless their stored hashes are still valid) to tell whether they differ;
+    otherwise the newer side wins. Metadata for
+    files already in sync is recorded on the handler directly. A file that
+    vanishes from one side while it is being planned is treated as missing
+    there, and skipped if it vanished from both.
+    """
+    files = {'a': _scan_folder(folder_a), 'b': _scan_folder(folder_b)}
+    folders = {'a': folder_a, 'b': folder_b}
+    copies = []
+    for rel_path in sorted(files['a'].keys() | files['b'].keys()):
+        stat_a = files['a'].get(rel_path)
+        stat_b = files['b'].get(rel_path)
+        path_a = os.path.join(folder_a, rel_path)
+        path_b = os.path.join(folder_b, rel_path)
+
+        if stat_a is None or stat_b is None:
+            src = 'a' if stat_b is None else 'b'
+            dest = 'b' if src == 'a' else 'a'
+            copies.append((os.path.join(folders[src], rel_path), os.path.join(folders[dest], rel_path),
+                           rel_path, src, dest))
+            continue
+
+        if (stat_a.st_size, stat_a.st_mtime_ns) == (stat_b.st_size, stat_b.st_mtime_ns):
+            meta_a = _known_metadata(handler, 'a', rel_path, path_a, stat_a)
+            meta_b = _known_metadata(handler, 'b', rel_path, path_b, stat_b)
+            if meta_a is None and meta_b is None:
+                meta_a = handler._get_file_metadata(path_a)
+                if meta_a is None:
+                    # Deleted since the scan
+                    copies.append((path_b, path_a, rel_path, 'b', 'a'))
+                    continue
+            if meta_a is None or meta_b is None:
+                # Hash one side at most and reuse it for the other
+                meta_a = meta_a or handler._remember(path_a, stat_a, meta_b)
+                meta_b = meta_b or handler._remember(path_b, stat_b, meta_a)
+            handler.metadata['a'][rel_path] = meta_a
+            handler.metadata['b'][rel_path] = meta_b
+            continue
+
+        if stat_a.st_size == stat_b.st_size:
+            meta_a = (_known_metadata(handler, 'a', rel_path, path_a, stat_a)
+                      or handler._get_file_metadata(path_a))
+            meta_b = (_known_metadata(handler, 'b', rel_path, path_b, stat_b)
+                      or handler._get_file_metadata(path_b))
+            if meta_a is None or meta_b is None:
+                # Deleted from one or both sides since the scan
+                if meta_a or meta_b:
+                    src, dest = ('a', 'b') if meta_a else ('b', 'a')
+                    copies.append((os.path.join(folders[src], rel_path), os.path.join(folders[dest], rel_path),
+                                   rel_path, src, dest))
+                continue
+            if meta_a['hash'] == meta_b['hash']:
+                handler.metadata['a'][rel_path] = meta_a
+                handler.metadata['b'][rel_path] = meta_b
+                continue
+
+        if stat_a.st_mtime_ns >= stat_b.st_mtime_ns:
+            copies.append((path_a, path_b, rel_path, 'a', 'b'))
+        else:
+            copies.append((path_b, path_a, rel_path, 'b', 'a'))
+    return copies
+
+
+def initial_sync(folder_a, folder_b, handler, workers=4, progress_interval=5.0):
+    """
+    Reconcile both folders before watching them: plan the copies needed in both
+    directions, then run them on a pool of `workers` threads, logging progress
+    every `progress_interval` seconds.
+    """
     logger.info("Performing initial synchronization...")
+    copies = plan_initial_sync(os.path.abspath(folder_a), os.path.abspath(folder_b), handler)
+    total_bytes = 0
+    for src_path, *_ in copies:
+        try:
+            total_bytes += os.path.getsize(src_path)
+        except OSError:
+            pass
+    logger.info(f"Initial sync plan: {len(copies)} files ({total_bytes / 1024 / 1024:.1f} MB) to copy")
+
+    def copy(job):
+        src_path, dest_path = job[:2]
+        handler._sync_file(src_path, dest_path)
+        return handler._get_file_metadata(src_path), handler._get_file_metadata(dest_path)
 
-    for root, _, files in os.walk(folder_a):
-        for file in files:
-            src_path = os.path.join(root, file)
-            rel_path = os.path.relpath(src_path, folder_a)
-            dest_path = os.path.join(folder_b, rel_path)
-
-            meta_src = handler._get_file_metadata(src_path)
-            meta_dest = handler.metadata['b'].get(rel_path)
-
-            if meta_dest != meta_src:
-                os.makedirs(os.path.dirname(dest_path), exist_ok=True)
-                shutil.copy2(src_path, dest_path)
-                handler.metadata['b'][rel_path] = handler._get_file_metadata(dest_path)
-                logger.info(f"Initial sync: {src_path} -> {dest_path}")
-            handler.metadata['a'][rel_path] = meta_src
-
-    for root, _, files in os.walk(folder_b):
-        for file in files:
-            src_path = os.path.join(root, file)
-            rel_path = os.path.relpath(src_path, folder_b)
-            dest_path = os.path.join(folder_a, rel_path)
-
-            meta_src = handler._get_file_metadata(src_path)
-            meta_dest = handler.metadata['a'].get(rel_path)
-
-            if meta_dest != meta_src:
-                os.makedirs(os.path.dirname(dest_path), exist_ok=True)
-                shutil.copy2(src_path, dest_path)
-                handler.metadata['a'][rel_path] = handler._get_file_metadata(dest_path)
-                logger.info(f"Initial sync: {src_path} -> {dest_path}")
-            handler.metadata['b'][rel_path] = meta_src
+    done = 0
+    done_bytes = 0
+    start = last_report = time.monotonic()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for (_, _, rel_path, src, dest), (src_meta, dest_meta) in zip(copies, executor.map(copy, copies)):
+            if src_meta:
+                handler.metadata[src][rel_path] = src_meta
+                done_bytes += src_meta['size']
+            if dest_meta:
+                handler.metadata[dest][rel_path] = dest_meta
+            done += 1
+            now = time.monotonic()
+            if now - last_report >= progress_interval:
+                last_report = now
+                logger.info(f"Initial sync: {done}/{len(copies)} files, "
+                            f"{done_bytes / 1024 / 1024:.1f}/{total_bytes / 1024 / 1024:.1f} MB "
+                            f"({done_bytes / 1024 / 1024 / (now - start):.1f} MB/s)")
 
     handler._save_metadata()
-    logger.info("Initial synchronization complete.")
+    logger.info(f"Initial synchronization complete: {done} files copied in {time.monotonic() - start:.1f}s.")
 
 
-if __name__ == "__main__":
-    folder_a = "folder_a"  # Replace with your first folder path
-    folder_b = "folder_b"  # Replace with your second folder path
+class ReplicaTarget:
+    """
+    One replica of a fan-out sync. Changes are sharded by path over `workers`
+    queues, each drained by its own thread, so a target applies changes
+    concurrently while the changes to any one path stay in order.
+    """
+
+    def __init__(self, source, path, blocks, workers=4, copy_options=None):
+        self.source = source
+        self.path = os.path.abspath(path)
+        self.blocks = blocks
+        self.copy_options = copy_options or {}
+        self.queues = [queue.Queue() for _ in range(workers)]
+        self.threads = []
+        # Metrics
+        self._lock = threading.Lock()
+        self.applied = 0
+        self.errors = 0
+        self.bytes_written = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+
+    def start(self):
+        for index, changes in enumerate(self.queues):
+            thread = threading.Thread(target=self._run, args=(changes,),
+                                      name=f"replica-{os.path.basename(self.path)}-{index}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
 
+    def stop(self):
+        """Apply the changes already queued, then stop the worker threads."""
+        for changes in self.queues:
+            changes.put(None)
+        for thread in self.threads:
+            thread.join()
+
+    def submit(self, kind, rel_path, queued_at):
+        self.queues[hash(rel_path) % len(self.queues)].put((kind, rel_path, queued_at))
+
+    def pending(self):
+        return sum(changes.qsize() for changes in self.queues)
+
+    def _run(self, changes):
+        while True:
+            change = changes.get()
+            if change is None:
+                return
+            kind, rel_path, queued_at = change
+            try:
+                written = self._apply(kind, rel_path)
+                error = False
+            except Exception as e:
+                logger.error(f"Error applying {kind} of {rel_path} to {self.path}: {e}")
+                written, error = 0, True
+            lag = time.monotonic() - queued_at
+            with self._lock:
+                self.applied += 1
+                self.errors += error
+                self.bytes_written += written
+                self.last_lag = lag
+                self.max_lag = max(self.max_lag, lag)
+
+    def _apply(self, kind, rel_path):
+        """Mirror one change of the source onto this replica; returns the bytes written."""
+        src_path = os.path.join(self.source, rel_path)
+        dest_path = os.path.join(self.path, rel_path)
+        if kind == 'deleted':
+            if os.path.lexists(src_path):
+                # Recreated since; its own created event brings the replica up to date
+                return 0
+            if os.path.isdir(dest_path) and not os.path.islink(dest_path):
+                shutil.rmtree(dest_path)
+                self.blocks.pop_subtree(dest_path)
+            else:
+                try:
+                    os.remove(dest_path)
+                except FileNotFoundError:
+                    return 0
+                self.blocks.pop(dest_path, None)
+            logger.info(f"Deleted: {dest_path}")
+            self._remove_empty_parents(rel_path)
+            return 0
+
+        try:
+            src_stat = os.stat(src_path)
+        except FileNotFoundError:
+            # Removed again before we got to it; its deletion event follows
+            return 0
+        try:
+            dest_stat = os.stat(dest_path)
+            if (dest_stat.st_size, dest_stat.st_mtime_ns) == (src_stat.st_size, src_stat.st_mtime_ns):
+                return 0
+        except FileNotFoundError:
+            pass
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        written = copy_file(src_path, dest_path, self.blocks, **self.copy_options)
+        logger.info(f"Synced: {src_path} -> {dest_path}")
+        return written
+
+    def _remove_empty_parents(self, rel_path):
+        """Remove the replica's now empty directories that no longer exist in the source."""
+        parent = os.path.dirname(rel_path)
+        while parent and not os.path.exists(os.path.join(self.source, parent)):
+            try:
+                os.rmdir(os.path.join(self.path, parent))
+            except OSError:
+                return
+            parent = os.path.dirname(parent)
+
+    def prune(self):
+        """Queue the deletion of every replica file and directory missing from the source."""
+        queued_at = time.monotonic()
+        for root, dirs, files in os.walk(self.path):
+            rel_root = os.path.relpath(root, self.path)
+            for name in list(dirs):
+                rel_path = os.path.normpath(os.path.join(rel_root, name))
+                if not os.path.isdir(os.path.join(self.source, rel_path)):
+                    self.submit('deleted', rel_path, queued_at)
+                    dirs.remove(name)
+            for name in files:
+                rel_path = os.path.normpath(os.path.join(rel_root, name))
+                if not os.path.lexists(os.path.join(self.source, rel_path)):
+                    self.submit('deleted', rel_path, queued_at)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "target": self.path,
+                "applied": self.applied,
+                "pending": self.pending(),
+                "errors": self.errors,
+                "bytes_written": self.bytes_written,
+                "last_lag_seconds": self.last_lag,
+                "max_lag_seconds": self.max_lag,
+            }
+
+
+class FanOutSync(FileSystemEventHandler):
+    """
+    One-way sync of a source folder to any number of replicas.
+
+    A single observer watches the source and feeds one debounced EventQueue; a
+    dispatcher thread hands every change to each ReplicaTarget, whose workers
+    apply it independently, so a slow replica never holds the others back.
+    """
+
+    def __init__(self, source, targets, workers=4, metadata_file="sync_metadata.db", debounce=0.5,
+                 report_interval=30.0, delta=True, delta_min_size=DELTA_MIN_SIZE, block_size=DELTA_BLOCK_SIZE):
+        self.source = os.path.abspath(source)
+        for target in targets:
+            target = os.path.abspath(target)
+            if target == self.source or target.startswith(self.source + os.sep):
+                raise ValueError(f"Replica {target} must not be inside the source folder")
+        self.events = EventQueue(debounce)
+        self.metadata = MetadataStore(metadata_file)
+        copy_options = {"delta": delta, "delta_min_size": delta_min_size, "block_size": block_size}
+        self.targets = [ReplicaTarget(self.source, target, self.metadata['blocks'], workers, copy_options)
+                        for target in targets]
+        self.report_interval = report_interval
+        self.observer = None
+        self._dispatcher = None
+        self._stop_event = threading.Event()
+        self._last_report = time.monotonic()
+        self._reported_bytes = [0] * len(self.targets)
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self.events.put('created', os.path.abspath(event.src_path))
+
+    def on_deleted(self, event):
+        # A deleted directory is removed from the replicas as a whole, as its
+        # files may not get events of their own (e.g. when moved out of the source)
+        self.events.put('deleted', os.path.abspath(event.src_path))
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.events.put('modified', os.path.abspath(event.src_path))
+
+    def on_moved(self, event):
+        """A rename, including an atomic save over an existing file, is a delete plus a create."""
+        self.events.put('deleted', os.path.abspath(event.src_path))
+        dest_path = os.path.abspath(event.dest_path)
+        if not dest_path.startswith(self.source + os.sep):
+            return
+        if event.is_directory:
+            for root, _, files in os.walk(dest_path):
+                for name in files:
+                    self.events.put('created', os.path.join(root, name))
+        else:
+            self.events.put('created', dest_path)
+
+    def start(self):
+        """
+        Start the replica workers and the observer, then queue every source file
+        and every replica-only path for reconciliation. Watching starts first so
+        no file created during the walk is missed.
+        """
+        for target in self.targets:
+            os.makedirs(target.path, exist_ok=True)
+            target.start()
+        self.observer = Observer()
+        self.observer.schedule(self, self.source, recursive=True)
+        self.observer.start()
+
+        logger.info(f"Reconciling {len(self.targets)} replicas with '{self.source}'...")
+        for root, _, files in os.walk(self.source):
+            for name in files:
+                self._dispatch('created', os.path.join(root, name))
+        for target in self.targets:
+            target.prune()
+
+        self._dispatcher = threading.Thread(target=self._run, name="fan-out-dispatcher", daemon=True)
+        self._dispatcher.start()
+
+    def stop(self):
+        """Stop watching, apply every change already seen and save the metadata."""
+        if self.observer:
+            self.observer.stop()
+            self.observer.join()
+        self._stop_event.set()
+        self.events.close()
+        if self._dispatcher:
+            self._dispatcher.join()
+        for kind, path in self.events.drain():
+            self._dispatch(kind, path)
+        for target in self.targets:
+            target.stop()
+        self.metadata.close()
+        self.report()
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            for kind, path in self.events.get_ready(timeout=1.0):
+                self._dispatch(kind, path)
+            self.metadata.commit()
+            if time.monotonic() - self._last_report >= self.report_interval:
+                self.report()
+
+    def _dispatch(self, kind, path):
+        rel_path = os.path.relpath(path, self.source)
+        queued_at = time.monotonic()
+        for target in self.targets:
+            target.submit(kind, rel_path, queued_at)
+
+    def stats(self):
+        """Per-replica metrics: changes applied and pending, errors, bytes written and lag."""
+        return [target.stats() for target in self.targets]
+
+    def report(self):
+        """Log each replica's backlog, lag and throughput since the last report."""
+        now = time.monotonic()
+        elapsed = max(now - self._last_report, 1e-9)
+        for index, stats in enumerate(self.stats()):
+            rate = (stats["bytes_written"] - self._reported_bytes[index]) / 1024 / 1024 / elapsed
+            self._reported_bytes[index] = stats["bytes_written"]
+            logger.info(f"Replica {stats['target']}: {stats['applied']} applied, {stats['pending']} pending, "
+                        f"{stats['errors']} errors, lag {stats['last_lag_seconds']:.2f}s "
+                        f"(max {stats['max_lag_seconds']:.2f}s), {rate:.1f} MB/s")
+        self._last_report = now
+
+
+def parse_arguments():
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description="Keep folders in sync in real time")
+    parser.add_argument('folders', nargs='*', default=["folder_a", "folder_b"],
+                        help="Two folders to sync both ways, or with --fan-out a source followed by its replicas")
+    parser.add_argument('--fan-out', action='store_true',
+                        help="Sync one way from the first folder to every other folder")
+    parser.add_argument('--workers', type=int, default=4,
+                        help="Copy threads (per replica with --fan-out) (default: 4)")
+    parser.add_argument('--metadata', default="sync_metadata.db", help="Metadata database file")
+    args = parser.parse_args()
+    if args.fan_out and len(args.folders) < 2:
+        parser.error("--fan-out needs a source and at least one replica")
+    if not args.fan_out and len(args.folders) != 2:
+        parser.error("exactly two folders are needed for two-way sync")
+    return args
+
+
+def wait_for_interrupt():
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        logger.info("Stopping observers...")
+
+
+def run_fan_out(source, targets, args):
+    os.makedirs(source, exist_ok=True)
+    sync = FanOutSync(source, targets, workers=args.workers, metadata_file=args.metadata)
+    sync.start()
+    logger.info(f"Monitoring changes in '{source}' for {len(targets)} replicas... Press Ctrl+C to stop.")
+    wait_for_interrupt()
+    sync.stop()
+
+
+def run_two_way(folder_a, folder_b, args):
     os.makedirs(folder_a, exist_ok=True)
     os.makedirs(folder_b, exist_ok=True)
 
-    handler = SyncHandler(folder_a, folder_b)
-    initial_sync(folder_a, folder_b, handler)
+    handler = SyncHandler(folder_a, folder_b, metadata_file=args.metadata)
+    initial_sync(folder_a, folder_b, handler, workers=args.workers)
+    handler.start()
 
     observer_a = Observer()
     observer_a.schedule(handler, folder_a, recursive=True)
@@ -220,13 +1087,18 @@ if __name__ == "__main__":
 
     logger.info(f"Monitoring changes in '{folder_a}' and '{folder_b}'... Press Ctrl+C to stop.")
 
-    try:
-        while True:
-            time.sleep(1)
-    except KeyboardInterrupt:
-        logger.info("Stopping observers...")
-        observer_a.stop()
-        observer_b.stop()
+    wait_for_interrupt()
+    observer_a.stop()
+    observer_b.stop()
 
     observer_a.join()
     observer_b.join()
+    handler.stop()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    if args.fan_out:
+        run_fan_out(args.folders[0], args.folders[1:], args)
+    else:
+        run_two_way(args.folders[0], args.folders[1], args)
@@ -0,0 +1,281 @@
+import argparse
+import http.client
+import json
+import os
+import random
+import sys
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+import mysql.connector
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SQL_DIR = os.path.join(HERE, '..', '..', 'SQL')
+sys.path.insert(0, os.path.join(HERE, '..', 'src'))
+
+from db import db_config  # noqa: E402
+from refresh_aggregate import AggregateRefresher  # noqa: E402
+
+
+# DDL files in dependency order (foreign keys first)
+DDL_FILES = [
+    'customers_DDL.sql',
+    'products_DDL.sql',
+    'orders_DDL.sql',
+    'order_items_DDL.sql',
+    'orders_aggregate_DDL.sql',
+    'product_inventory_DDL.sql',
+    'report_summaries_DDL.sql',
+    'aggregate_refresh_state_DDL.sql',
+    'deleted_orders_DDL.sql',
+]
+
+REPORT_ENDPOINTS = [
+    '/reports/top_customers?limit=10',
+    '/reports/monthly_sales',
+    '/reports/products_never_ordered',
+    '/reports/aov_by_country',
+    '/reports/frequent_buyers',
+]
+
+COUNTRIES = ['USA', 'Canada', 'UK', 'Ghana', 'Nigeria', 'Germany', 'France', 'India', 'Brazil', 'Japan']
+CATEGORIES = ['Electronics', 'Furniture', 'Appliances', 'Books', 'Toys']
+STATUSES = ['Pending', 'Shipped', 'Delivered', 'Cancelled']
+
+
+# --- Seeding ---
+def sql_statements(path):
+    """Split a .sql file into statements, skipping comment-only chunks."""
+    with open(path) as f:
+        chunks = f.read().split(';')
+    for chunk in chunks:
+        code = [line for line in chunk.splitlines() if line.strip() and not line.strip().startswith('--')]
+        if code:
+            yield chunk.strip()
+
+
+def insert_batches(cursor, query, rows, batch_size):
+    for start in range(0, len(rows), batch_size):
+        cursor.executemany(query, rows[start:start + batch_size])
+
+
+def seed(args):
+    """Recreate the greyshop database and fill it with generated data."""
+    random.seed(args.seed)
+    config = dict(db_config)
+    config.pop('database', None)
+    conn = mysql.connector.connect(**config)
+    cursor = conn.cursor()
+
+    start = time.perf_counter()
+    cursor.execute("DROP DATABASE IF EXISTS greyshop")
+    cursor.execute("CREATE DATABASE greyshop")
+    cursor.execute("USE greyshop")
+    for name in DDL_FILES:
+        for statement in sql_statements(os.path.join(SQL_DIR, 'DDL', name)):
+            cursor.execute(statement)
+    print(f"Created schema in {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    customers = [
+        (i, f"Customer {i}", f"customer{i}@example.com", random.choice(COUNTRIES))
+        for i in range(1, args.customers + 1)
+    ]
+    products = [
+        (i, f"Product {i}", random.choice(CATEGORIES), round(random.uniform(5, 1500), 2))
+        for i in range(1, args.products + 1)
+    ]
+    # Leave some products unordered so products_never_ordered has results
+    ordered_products = max(1, int(args.products * 0.9))
+    first_day = date(2023, 1, 1)
+    orders = []
+    order_items = []
+    for order_id in range(1, args.orders + 1):
+        orders.append((
+            order_id,
+            random.randint(1, args.customers),
+            first_day + timedelta(days=random.randint(0, 729)),
+            random.choice(STATUSES),
+        ))
+        for _ in range(random.randint(1, args.max_items)):
+            product_id = random.randint(1, ordered_products)
+            order_items.append((
+                len(order_items) + 1, order_id, product_id,
+                random.randint(1, 5), products[product_id - 1][3],
+            ))
+
+    insert_batches(cursor, "INSERT INTO customers(customer_id, name, email, country) VALUES (%s, %s, %s, %s)",
+                   customers, args.batch_size)
+    insert_batches(cursor, "INSERT INTO products(product_id, name, category, price) VALUES (%s, %s, %s, %s)",
+                   products, args.batch_size)
+    insert_batches(cursor, "INSERT INTO orders(order_id, customer_id, order_date, status) VALUES (%s, %s, %s, %s)",
+                   orders, args.batch_size)
+    insert_batches(cursor, "INSERT INTO order_items(order_item_id, order_id, product_id, quantity, unit_price) "
+                           "VALUES (%s, %s, %s, %s, %s)", order_items, args.batch_size)
+    conn.commit()
+    print(f"Inserted {len(customers)} customers, {len(products)} products, {len(orders)} orders "
+          f"and {len(order_items)} order items in {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    for statement in sql_statements(os.path.join(SQL_DIR, 'DML', 'product_inventory_DML.sql')):
+        cursor.execute(statement)
+    conn.commit()
+    cursor.close()
+    AggregateRefresher(conn).refresh(full=True)
+    conn.close()
+    print(f"Built product_inventory, orders_aggregate and summaries in {time.perf_counter() - start:.2f}s")
+
+
+# --- Load Testing ---
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values))))
+    return sorted_values[rank - 1]
+
+
+class EndpointLoad:
+    """Drives one endpoint with `concurrency` keep-alive clients and records latencies."""
+
+    def __init__(self, base_url, path, concurrency, requests, bust_cache=False, timeout=30):
+        url = urllib.parse.urlsplit(base_url)
+        self.host = url.hostname
+        self.port = url.port or 80
+        self.path = path
+        self.concurrency = concurrency
+        self.requests = requests
+        self.bust_cache = bust_cache
+        self.timeout = timeout
+        self.latencies = []
+        self.errors = 0
+        self._issued = 0
+        self._lock = threading.Lock()
+
+    def _next_request(self):
+        with self._lock:
+            if self._issued >= self.requests:
+                return None
+            self._issued += 1
+            return self._issued
+
+    def _worker(self):
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        latencies = []
+        errors = 0
+        try:
+            while (n := self._next_request()) is not None:
+                path = self.path
+                if self.bust_cache:
+                    path += ('&' if '?' in path else '?') + f"_bench={n}"
+                start = time.perf_counter()
+                try:
+                    conn.request('GET', path)
+                    response = conn.getresponse()
+                    response.read()
+                    if response.status != 200:
+                        errors += 1
+                except (OSError, http.client.HTTPException):
+                    errors += 1
+                    conn.close()
+                latencies.append(time.perf_counter() - start)
+        finally:
+            conn.close()
+        with self._lock:
+            self.latencies.extend(latencies)
+            self.errors += errors
+
+    def run(self):
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for _ in range(self.concurrency):
+                executor.submit(self._worker)
+        elapsed = time.perf_counter() - start
+
+        latencies = sorted(self.latencies)
+        return {
+            'endpoint': self.path,
+            'requests': len(latencies),
+            'errors': self.errors,
+            'rps': len(latencies) / elapsed if elapsed else 0.0,
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p95_ms': percentile(latencies, 95) * 1000,
+            'p99_ms': percentile(latencies, 99) * 1000,
+            'max_ms': (latencies[-1] if latencies else 0.0) * 1000,
+        }
+
+
+def print_results(results, baseline=None):
+    baseline = {row['endpoint']: row for row in baseline or []}
+    header = f"{'endpoint':<45}{'requests':>9}{'errors':>8}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    print(header)
+    print('-' * len(header))
+    for row in results:
+        print(f"{row['endpoint']:<45}{row['requests']:>9}{row['errors']:>8}{row['rps']:>10.1f}"
+              f"{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}{row['p99_ms']:>10.2f}")
+        base = baseline.get(row['endpoint'])
+        if base:
+            print(f"{'  vs baseline':<45}{'':>9}{'':>8}"
+                  f"{row['rps'] - base['rps']:>+10.1f}{row['p50_ms'] - base['p50_ms']:>+10.2f}"
+                  f"{row['p95_ms'] - base['p95_ms']:>+10.2f}{row['p99_ms'] - base['p99_ms']:>+10.2f}")
+
+
+def run(args):
+    """Load test each endpoint in turn and print throughput and latency percentiles."""
+    endpoints = args.endpoints or REPORT_ENDPOINTS
+    results = []
+    for path in endpoints:
+        # Warm up connections (and the cache, unless it is being bypassed)
+        EndpointLoad(args.url, path, 1, args.warmup, args.bust_cache).run()
+        results.append(EndpointLoad(args.url, path, args.concurrency, args.requests, args.bust_cache).run())
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=4)
+        print(f"\nSaved results to {args.save}")
+
+
+def parse_arguments():
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description="Seed and load test the Greyshop Reports API")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    seed_parser = subparsers.add_parser('seed', help="Recreate and fill the greyshop database (DB_* env vars)")
+    seed_parser.add_argument('--customers', type=int, default=10000)
+    seed_parser.add_argument('--products', type=int, default=1000)
+    seed_parser.add_argument('--orders', type=int, default=100000)
+    seed_parser.add_argument('--max-items', type=int, default=4, help="Maximum items per order")
+    seed_parser.add_argument('--batch-size', type=int, default=5000, help="Rows per INSERT batch")
+    seed_parser.add_argument('--seed', type=int, default=42, help="Random seed for reproducible data")
+    seed_parser.set_defaults(func=seed)
+
+    run_parser = subparsers.add_parser('run', help="Load test the report endpoints")
+    run_parser.add_argument('--url', default='http://localhost:5000', help="Base URL of the API")
+    run_parser.add_argument('--endpoints', nargs='*', help="Paths to test (default: all five reports)")
+    run_parser.add_argument('--concurrency', type=int, default=8, help="Concurrent clients per endpoint")
+    run_parser.add_argument('--requests', type=int, default=1000, help="Requests per endpoint")
+    run_parser.add_argument('--warmup', type=int, default=20, help="Warm-up requests per endpoint")
+    run_parser.add_argument('--bust-cache', action='store_true',
+                            help="Add a unique query parameter to every request so the report cache never hits")
+    run_parser.add_argument('--save', help="Write results as JSON to this file")
+    run_parser.add_argument('--baseline', help="Compare against results saved earlier with --save")
+    run_parser.set_defaults(func=run)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
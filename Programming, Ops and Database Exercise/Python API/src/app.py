@@ -1,34 +1,107 @@
-from flask import Flask, jsonify, request
 import os
-import mysql.connector
+
+from flask import Flask, Response, abort, jsonify, request
 from mysql.connector import Error
-from dotenv import load_dotenv
+
+from cache import cached_report, report_cache
+from db import get_db_connection, pool
+from metrics import collectors, fetch_all, init_app, timed
+from serializers import ReportJSONProvider, dumps, shape_rows
+import queries
 
 
 app = Flask(__name__)
-load_dotenv()
-
-# --- Database Configuration ---
-# Load configuration from environment variables
-db_config = {
-    'host': os.getenv('DB_HOST', 'localhost'),
-    'database': os.getenv('DB_DATABASE'),
-    'user': os.getenv('DB_USER'),
-    'password': os.getenv('DB_PASSWORD'),
-    'port': os.getenv('DB_PORT', 3306)
-}
-
-# --- Database Connection Helper ---
-def get_db_connection():
-    """Establishes a connection to the database."""
-    try:
-        print(db_config.items())
-        conn = mysql.connector.connect(**db_config)
-        return conn
-    except Error as e:
-        print(f"Error connecting to MySQL database: {e}")
+app.json = ReportJSONProvider(app)
+init_app(app)
+
+MAX_PAGE_SIZE = int(os.getenv('MAX_PAGE_SIZE', 1000))
+STREAM_BATCH_SIZE = int(os.getenv('STREAM_BATCH_SIZE', 500))
+
+
+def pool_and_cache_metrics():
+    """Connection pool and report cache figures for the /metrics endpoint."""
+    pool_stats = pool.stats()
+    cache_stats = report_cache.stats()
+    return [
+        ('greyshop_db_pool_size', 'gauge', 'Maximum pooled connections.', pool_stats['size']),
+        ('greyshop_db_pool_connections_in_use', 'gauge', 'Pooled connections checked out.', pool_stats['in_use']),
+        ('greyshop_db_pool_connections_idle', 'gauge', 'Pooled connections waiting for use.', pool_stats['idle']),
+        ('greyshop_db_pool_checkouts_total', 'counter', 'Connections checked out of the pool.', pool_stats['checkouts']),
+        ('greyshop_db_pool_wait_seconds_total', 'counter', 'Time spent waiting for pooled connections.',
+         pool_stats['wait_time_total']),
+        ('greyshop_db_pool_timeouts_total', 'counter', 'Checkouts that timed out.', pool_stats['timeouts']),
+        ('greyshop_db_pool_reconnects_total', 'counter', 'Stale connections reconnected.', pool_stats['reconnects']),
+        ('greyshop_db_pool_failed_discarded_total', 'counter', 'Connections closed after a query error.',
+         pool_stats['failed_discarded']),
+        ('greyshop_report_cache_hits_total', 'counter', 'Report cache hits.', cache_stats['hits']),
+        ('greyshop_report_cache_misses_total', 'counter', 'Report cache misses.', cache_stats['misses']),
+        ('greyshop_report_cache_entries', 'gauge', 'Cached report responses.', cache_stats['entries']),
+    ]
+
+collectors.append(pool_and_cache_metrics)
+
+
+# --- Response Helpers ---
+def rows_response(columns, rows):
+    """
+    JSON response for report rows: a list of records, or one array per column
+    when the request asks for ?format=columnar.
+    """
+    with timed('serialize'):
+        return jsonify(shape_rows(columns, rows, request.args.get('format')))
+
+# --- Large Result Helpers ---
+def page_params():
+    """
+    Read keyset pagination parameters from the query string.
+
+    Returns (cursor, page_size), or None if the request is not paginated.
+    """
+    page_size = request.args.get('page_size', type=int)
+    if page_size is None and 'cursor' not in request.args:
         return None
+    page_size = max(1, min(page_size or MAX_PAGE_SIZE, MAX_PAGE_SIZE))
+    return request.args.get('cursor', default=0, type=int), page_size
 
+def page_response(columns, rows, page_size, key):
+    """Wrap one page of rows with the cursor to pass for the next page (null on the last page)."""
+    next_cursor = rows[-1][columns.index(key)] if len(rows) == page_size else None
+    with timed('serialize'):
+        items = shape_rows(columns, rows, request.args.get('format'))
+        return jsonify({"items": items, "next_cursor": next_cursor})
+
+def stream_rows(query, description, params=()):
+    """
+    Stream query rows as newline-delimited JSON, fetching STREAM_BATCH_SIZE rows
+    at a time from an unbuffered cursor so memory stays flat for any result size.
+    """
+    conn = get_db_connection()
+    if conn is None:
+        return jsonify({"error": "Database connection failed"}), 500
+
+    def generate():
+        cursor = conn.cursor()
+        try:
+            cursor.execute(query, params)
+            columns = cursor.column_names
+            while True:
+                rows = cursor.fetchmany(STREAM_BATCH_SIZE)
+                if not rows:
+                    break
+                yield b''.join(dumps(dict(zip(columns, row))) + b'\n' for row in rows)
+        except Error as e:
+            print(f"Error streaming query for {description}: {e}")
+        finally:
+            # A client that disconnects mid-stream leaves unread rows, and
+            # cursor.close() raises; the pool then discards the connection
+            try:
+                cursor.close()
+            except Error as e:
+                print(f"Error closing cursor for {description}: {e}")
+            finally:
+                conn.close()
+
+    return Response(generate(), mimetype='application/x-ndjson')
 
 
 # --- API Endpoints ---
@@ -37,7 +110,41 @@ def index():
     """Root endpoint."""
     return "Welcome to GREYSHOP Reports API!"
 
+@app.route('/stats/pool', methods=['GET'])
+def get_pool_stats():
+    """
+    Endpoint to inspect the database connection pool: size, connections in use,
+    checkouts, checkout wait times, timeouts, reconnects and connections
+    discarded after errors.
+    """
+    return jsonify(pool.stats())
+
+@app.route('/stats/cache', methods=['GET'])
+def get_cache_stats():
+    """
+    Endpoint to inspect the report cache: hits, misses, hit rate, evictions and entry count.
+    """
+    return jsonify(report_cache.stats())
+
+@app.route('/reports/cache/invalidate', methods=['POST'])
+def invalidate_report_cache():
+    """
+    Endpoint to drop cached report results, to be called after orders_aggregate is refreshed.
+
+    Optional Query Parameters:
+        - report (str): Only invalidate this report (e.g. top_customers). Defaults to all reports.
+
+    If CACHE_INVALIDATE_TOKEN is set, it must be sent in the X-Cache-Token header.
+    """
+    token = os.getenv('CACHE_INVALIDATE_TOKEN')
+    if token and request.headers.get('X-Cache-Token') != token:
+        abort(403)
+    report = request.args.get('report')
+    dropped = report_cache.invalidate(report)
+    return jsonify({"invalidated": dropped, "report": report or "all"})
+
 @app.route('/reports/top_customers', methods=['GET'])
+@cached_report('top_customers')
 def get_top_customers():
     """
     Endpoint to get top customers by total spending from the database.
@@ -50,22 +157,14 @@ def get_top_customers():
     if conn is None:
         return jsonify({"error": "Database connection failed"}), 500
 
-    cursor = conn.cursor(dictionary=True) # Use dictionary=True to get column names
+    cursor = conn.cursor()
+    columns = ()
     top_customers_list = []
 
     try:
-        query = """
-        SELECT
-        customer_id,
-        sum(total_amount) AS customer_money_spent
-        FROM greyshop.orders_aggregate
-        WHERE status != 'cancelled'
-        GROUP BY customer_id
-        ORDER BY customer_money_spent DESC
-        LIMIT %s;
-        """
-        cursor.execute(query, (limit,))
-        top_customers_list = cursor.fetchall()
+        query = queries.TOP_CUSTOMERS
+        top_customers_list = fetch_all(cursor, query, (limit,))
+        columns = cursor.column_names
 
     except Error as e:
         print(f"Error executing query for top customers: {e}")
@@ -77,14 +176,10 @@ def get_top_customers():
         if conn:
             conn.close()
 
-    # Ensure decimal values are floats for JSON serialization
-    for customer in top_customers_list:
-         customer['customer_money_spent'] = float(customer['customer_money_spent'])
-
-
-    return jsonify(top_customers_list)
+    return rows_response(columns, top_customers_list)
 
 @app.route('/reports/monthly_sales', methods=['GET'])
+@cached_report('monthly_sales')
 def get_monthly_sales():
     """
     Endpoint to get monthly sales reports for Shipped and Delivered orders from the database.
@@ -93,21 +188,14 @@ def get_monthly_sales():
     if conn is None:
         return jsonify({"error": "Database connection failed"}), 500
 
-    cursor = conn.cursor(dictionary=True)
+    cursor = conn.cursor()
+    columns = ()
     monthly_sales_list = []
 
     try:
-        query = """
-          SELECT
-          MONTH(order_date) AS "month",
-          COUNT(DISTINCT order_id) AS total_number_of_orders,
-          sum(total_amount) AS total_monthly_sales
-          FROM greyshop.orders_aggregate
-          WHERE status in ('Shipped','Delivered')
-          GROUP BY 1
-        """
-        cursor.execute(query)
-        monthly_sales_list = cursor.fetchall()
+        query = queries.MONTHLY_SALES
+        monthly_sales_list = fetch_all(cursor, query)
+        columns = cursor.column_names
 
     except Error as e:
         print(f"Error executing query for monthly sales: {e}")
@@ -119,33 +207,41 @@ def get_monthly_sales():
         if conn:
             conn.close()
 
-    # Ensure decimal values are floats for JSON serialization
-    for month_data in monthly_sales_list:
-         month_data['total_monthly_sales'] = float(month_data['total_monthly_sales'])
-
-    return jsonify(monthly_sales_list)
+    return rows_response(columns, monthly_sales_list)
 
 @app.route('/reports/products_never_ordered', methods=['GET'])
+@cached_report('products_never_ordered')
 def get_products_never_ordered():
     """
     Endpoint to list products that have never been included in any order items from the database.
+
+    Optional Query Parameters:
+        - page_size (int): Return one page of at most this many products, as
+          {"items": [...], "next_cursor": ...}. Capped at MAX_PAGE_SIZE.
+        - cursor (int): The next_cursor of the previous page. Defaults to the first page.
+        - stream (int): If 1, stream every product as newline-delimited JSON.
     """
+    if request.args.get('stream', default=0, type=int):
+        return stream_rows(queries.PRODUCTS_NEVER_ORDERED, "products never ordered")
+    page = page_params()
+
     conn = get_db_connection()
     if conn is None:
         return jsonify({"error": "Database connection failed"}), 500
 
-    cursor = conn.cursor(dictionary=True)
+    cursor = conn.cursor()
+    columns = ()
     never_ordered_products_list = []
 
     try:
-        query = """
-          SELECT
-          *
-          FROM greyshop.product_inventory
-          WHERE quantity_sold = 0
-        """
-        cursor.execute(query)
-        never_ordered_products_list = cursor.fetchall()
+        if page:
+            query = queries.PRODUCTS_NEVER_ORDERED_PAGE
+            params = page
+        else:
+            query = queries.PRODUCTS_NEVER_ORDERED
+            params = None
+        never_ordered_products_list = fetch_all(cursor, query, params)
+        columns = cursor.column_names
 
     except Error as e:
         print(f"Error executing query for products never ordered: {e}")
@@ -157,9 +253,12 @@ def get_products_never_ordered():
         if conn:
             conn.close()
 
-    return jsonify(never_ordered_products_list)
+    if page:
+        return page_response(columns, never_ordered_products_list, page[1], 'product_id')
+    return rows_response(columns, never_ordered_products_list)
 
 @app.route('/reports/aov_by_country', methods=['GET'])
+@cached_report('aov_by_country')
 def get_aov_by_country():
     """
     Endpoint to calculate Average Order Value (AOV) grouped by customer country from the database.
@@ -169,21 +268,14 @@ def get_aov_by_country():
     if conn is None:
         return jsonify({"error": "Database connection failed"}), 500
 
-    cursor = conn.cursor(dictionary=True)
+    cursor = conn.cursor()
+    columns = ()
     aov_list = []
 
     try:
-        query = """
-          SELECT
-          country,
-          sum(total_amount) AS total_sales,
-          count(order_id) AS total_orders,
-          sum(total_amount) / count(order_id) as aov
-          FROM greyshop.orders_aggregate
-          GROUP BY country
-        """
-        cursor.execute(query)
-        aov_list = cursor.fetchall()
+        query = queries.AOV_BY_COUNTRY
+        aov_list = fetch_all(cursor, query)
+        columns = cursor.column_names
 
     except Error as e:
         print(f"Error executing query for AOV by country: {e}")
@@ -195,38 +287,42 @@ def get_aov_by_country():
         if conn:
             conn.close()
 
-    # Ensure decimal values are floats for JSON serialization
-    for country_data in aov_list:
-         country_data['aov'] = float(country_data['aov'])
-         country_data['total_sales'] = float(country_data['total_sales'])
-
-
-    return jsonify(aov_list)
+    return rows_response(columns, aov_list)
 
 
 @app.route('/reports/frequent_buyers', methods=['GET'])
+@cached_report('frequent_buyers')
 def get_frequent_buyers():
     """
     Endpoint to list customers who have placed more than one order from the database.
+
+    Optional Query Parameters:
+        - page_size (int): Return one page of at most this many customers, as
+          {"items": [...], "next_cursor": ...}. Capped at MAX_PAGE_SIZE.
+        - cursor (int): The next_cursor of the previous page. Defaults to the first page.
+        - stream (int): If 1, stream every customer as newline-delimited JSON.
     """
+    if request.args.get('stream', default=0, type=int):
+        return stream_rows(queries.FREQUENT_BUYERS, "frequent buyers")
+    page = page_params()
+
     conn = get_db_connection()
     if conn is None:
         return jsonify({"error": "Database connection failed"}), 500
 
-    cursor = conn.cursor(dictionary=True)
+    cursor = conn.cursor()
+    columns = ()
     frequent_buyers_list = []
 
     try:
-        query = """
-            SELECT 
-            customer_id,
-            count(order_id) AS total_orders
-            FROM greyshop.orders_aggregate
-            GROUP BY 1
-            HAVING count(order_id) > 1
-        """
-        cursor.execute(query)
-        frequent_buyers_list = cursor.fetchall()
+        if page:
+            query = queries.FREQUENT_BUYERS_PAGE
+            params = page
+        else:
+            query = queries.FREQUENT_BUYERS
+            params = None
+        frequent_buyers_list = fetch_all(cursor, query, params)
+        columns = cursor.column_names
 
     except Error as e:
         print(f"Error executing query for frequent buyers: {e}")
@@ -238,7 +334,9 @@ def get_frequent_buyers():
         if conn:
             conn.close()
 
-    return jsonify(frequent_buyers_list)
+    if page:
+        return page_response(columns, frequent_buyers_list, page[1], 'customer_id')
+    return rows_response(columns, frequent_buyers_list)
 
 
 # --- Run the App ---
@@ -0,0 +1,158 @@
+import asyncio
+import os
+from functools import wraps
+
+import aiomysql
+from quart import Quart, abort, current_app, jsonify, request
+
+from cache import cache_key, report_cache
+from db import db_config, pool_config
+from serializers import ReportJSONProvider, shape_rows
+import queries
+
+
+app = Quart(__name__)
+app.json = ReportJSONProvider(app)
+db_pool = None
+
+
+# --- Database Pool ---
+@app.before_serving
+async def create_db_pool():
+    """Create the shared aiomysql connection pool when the server starts."""
+    global db_pool
+    db_pool = await aiomysql.create_pool(
+        host=db_config['host'],
+        port=int(db_config['port']),
+        user=db_config['user'],
+        password=db_config['password'] or '',
+        db=db_config['database'],
+        maxsize=pool_config['size'],
+        pool_recycle=int(pool_config['recycle']),
+        autocommit=True,
+    )
+
+@app.after_serving
+async def close_db_pool():
+    """Close the connection pool when the server shuts down."""
+    db_pool.close()
+    await db_pool.wait_closed()
+
+
+async def run_report(name, params=()):
+    """Run a report query on a pooled connection and return its rows in the requested format."""
+    query = queries.REPORT_QUERIES[name][0]
+    async with db_pool.acquire() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute(query, params)
+            rows = await cursor.fetchall()
+            columns = [column[0] for column in cursor.description]
+    return shape_rows(columns, rows, request.args.get('format'))
+
+
+def async_cached_report(name):
+    """Async counterpart of cache.cached_report for the Quart endpoints."""
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(*args, **kwargs):
+            key = cache_key(name, request.args)
+            cached = report_cache.get(key)
+            if cached is not None:
+                body, mimetype = cached
+                response = current_app.response_class(body, mimetype=mimetype)
+                response.headers['X-Cache'] = 'HIT'
+                return response
+
+            generation = report_cache.generation
+            response = await current_app.make_response(await view(*args, **kwargs))
+            if response.status_code == 200:
+                report_cache.set(key, (await response.get_data(), response.mimetype), generation)
+            response.headers['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
+
+
+def report_endpoint(name, description, params=lambda: ()):
+    """Register an async /reports/<name> endpoint for one report."""
+    async def view():
+        try:
+            return jsonify(await run_report(name, params()))
+        except (aiomysql.Error, OSError) as e:
+            print(f"Error executing query for {description}: {e}")
+            return jsonify({"error": f"Failed to retrieve {description}"}), 500
+
+    view.__name__ = f"get_{name}"
+    view.__doc__ = f"Endpoint to get {description} from the database."
+    app.route(f'/reports/{name}', methods=['GET'])(async_cached_report(name)(view))
+
+
+def top_customers_params():
+    return (request.args.get('limit', default=1, type=int),)
+
+
+# --- API Endpoints ---
+@app.route('/')
+async def index():
+    """Root endpoint."""
+    return "Welcome to GREYSHOP Reports API!"
+
+@app.route('/stats/pool', methods=['GET'])
+async def get_pool_stats():
+    """Endpoint to inspect the aiomysql connection pool."""
+    return jsonify({
+        "size": db_pool.maxsize,
+        "open": db_pool.size,
+        "idle": db_pool.freesize,
+        "in_use": db_pool.size - db_pool.freesize,
+    })
+
+@app.route('/stats/cache', methods=['GET'])
+async def get_cache_stats():
+    """Endpoint to inspect the report cache."""
+    return jsonify(report_cache.stats())
+
+@app.route('/reports/cache/invalidate', methods=['POST'])
+async def invalidate_report_cache():
+    """Endpoint to drop cached report results, see app.invalidate_report_cache."""
+    token = os.getenv('CACHE_INVALIDATE_TOKEN')
+    if token and request.headers.get('X-Cache-Token') != token:
+        abort(403)
+    report = request.args.get('report')
+    dropped = report_cache.invalidate(report)
+    return jsonify({"invalidated": dropped, "report": report or "all"})
+
+report_endpoint('top_customers', 'top customers', top_customers_params)
+report_endpoint('monthly_sales', 'monthly sales')
+report_endpoint('products_never_ordered', 'products never ordered')
+report_endpoint('aov_by_country', 'AOV by country')
+report_endpoint('frequent_buyers', 'frequent buyers')
+
+@app.route('/reports/dashboard', methods=['GET'])
+@async_cached_report('dashboard')
+async def get_dashboard():
+    """
+    Endpoint to get all five reports in one response. The report queries run
+    concurrently, each on its own pooled connection.
+
+    Optional Query Parameters:
+        - limit (int): The maximum number of top customers to return. Defaults to 1.
+    """
+    names = list(queries.REPORT_QUERIES)
+    params = {'top_customers': top_customers_params()}
+    results = await asyncio.gather(
+        *(run_report(name, params.get(name, ())) for name in names),
+        return_exceptions=True
+    )
+
+    for name, result in zip(names, results):
+        if isinstance(result, Exception):
+            print(f"Error executing query for {name}: {result}")
+            return jsonify({"error": f"Failed to retrieve {name}"}), 500
+
+    return jsonify(dict(zip(names, results)))
+
+
+# --- Run the App ---
+if __name__ == '__main__':
+    app.run(host="0.0.0.0", port=5000)
@@ -0,0 +1,143 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, request
+
+
+# --- Cache Configuration ---
+# TTL in seconds per report. Override with e.g. CACHE_TTL_TOP_CUSTOMERS=60
+DEFAULT_TTL = float(os.getenv('CACHE_TTL_DEFAULT', 300))
+report_ttls = {
+    name: float(os.getenv(f'CACHE_TTL_{name.upper()}', DEFAULT_TTL))
+    for name in ('top_customers', 'monthly_sales', 'products_never_ordered',
+                 'aov_by_country', 'frequent_buyers')
+}
+max_entries = int(os.getenv('CACHE_MAX_ENTRIES', 256))
+
+# Cached responses built from other reports, dropped along with them
+# (async_app's /reports/dashboard contains all five)
+report_dependents = {name: ('dashboard',) for name in report_ttls}
+
+
+class ReportCache:
+    """
+    Thread-safe LRU cache of serialized report responses with per-report TTLs.
+
+    Entries are keyed by report name and query parameters. Every invalidation
+    bumps a generation counter so that a query which started before the
+    invalidation cannot store its (now stale) result afterwards. Invalidating a
+    report also drops the entries of the reports listed as its dependents.
+    """
+
+    def __init__(self, ttls, max_entries=256, default_ttl=300.0, dependents=None):
+        self.ttls = ttls
+        self.dependents = dependents or {}
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._stats = {'hits': 0, 'misses': 0, 'expired': 0, 'evictions': 0, 'invalidations': 0}
+
+    @property
+    def generation(self):
+        return self._generation
+
+    def get(self, key):
+        """Return the cached value for key, or None if missing or expired."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self._stats['expired'] += 1
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return value
+
+    def set(self, key, value, generation=None):
+        """Store value under key, evicting the least recently used entries when full."""
+        ttl = self.ttls.get(key[0], self.default_ttl)
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def invalidate(self, report=None):
+        """
+        Drop all cached entries, or only those of one report and its dependents.
+        Returns the number dropped.
+        """
+        with self._lock:
+            self._generation += 1
+            self._stats['invalidations'] += 1
+            if report is None:
+                dropped = len(self._entries)
+                self._entries.clear()
+                return dropped
+            reports = {report, *self.dependents.get(report, ())}
+            keys = [key for key in self._entries if key[0] in reports]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+
+    def stats(self):
+        """Snapshot of hit/miss counters and current size."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+        stats['max_entries'] = self.max_entries
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        stats['ttls'] = dict(self.ttls)
+        return stats
+
+
+report_cache = ReportCache(report_ttls, max_entries=max_entries, default_ttl=DEFAULT_TTL,
+                           dependents=report_dependents)
+
+
+def cache_key(name, args):
+    """Cache key for a report: its name plus the sorted query parameters."""
+    return (name, tuple(sorted(args.items(multi=True))))
+
+
+def cached_report(name):
+    """
+    Decorator for report endpoints that caches successful (200) responses,
+    keyed by report name and the request's query parameters.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            key = cache_key(name, request.args)
+            cached = report_cache.get(key)
+            if cached is not None:
+                body, mimetype = cached
+                response = current_app.response_class(body, mimetype=mimetype)
+                response.headers['X-Cache'] = 'HIT'
+                return response
+
+            generation = report_cache.generation
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code == 200 and not response.is_streamed:
+                report_cache.set(key, (response.get_data(), response.mimetype), generation)
+            response.headers['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,71 @@
+import argparse
+import sys
+
+import mysql.connector
+from mysql.connector import Error
+
+from db import db_config
+from queries import PAGE_QUERIES, REPORT_QUERIES
+
+
+def explain_report(cursor, query, params):
+    """Return the EXPLAIN rows for a report query."""
+    cursor.execute("EXPLAIN " + query.strip().rstrip(';'), params)
+    return cursor.fetchall()
+
+
+def find_full_scans(plan, max_scan_rows):
+    """
+    Return the plan rows that read a whole table (access type ALL).
+
+    Scans of tables estimated at no more than max_scan_rows rows (e.g. the
+    twelve-row monthly summary) are tolerated.
+    """
+    return [
+        row for row in plan
+        if row['type'] == 'ALL' and (row['rows'] or 0) > max_scan_rows
+    ]
+
+
+def parse_arguments():
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Fail if any Greyshop report query falls back to a full table scan")
+    parser.add_argument("--max-scan-rows", type=int, default=1000,
+                        help="Tolerate full scans of tables estimated at up to N rows (default: 1000)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    try:
+        conn = mysql.connector.connect(**db_config)
+    except Error as e:
+        print(f"Error connecting to MySQL database: {e}")
+        return 2
+
+    failures = 0
+    cursor = conn.cursor(dictionary=True)
+    try:
+        for name, (query, params) in {**REPORT_QUERIES, **PAGE_QUERIES}.items():
+            plan = explain_report(cursor, query, params)
+            full_scans = find_full_scans(plan, args.max_scan_rows)
+            status = "FAIL" if full_scans else "OK"
+            print(f"[{status}] {name}")
+            for row in plan:
+                print(f"    table={row['table']} type={row['type']} key={row['key']} "
+                      f"rows={row['rows']} extra={row['Extra']}")
+            failures += bool(full_scans)
+    finally:
+        cursor.close()
+        conn.close()
+
+    if failures:
+        print(f"\n{failures} report(s) fall back to a full table scan.")
+        return 1
+    print("\nAll reports use an index.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
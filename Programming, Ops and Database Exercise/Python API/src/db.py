@@ -0,0 +1,253 @@
+import os
+import queue
+import threading
+import time
+from functools import wraps
+
+import mysql.connector
+from mysql.connector import Error
+from mysql.connector.errors import PoolError
+from dotenv import load_dotenv
+
+from metrics import timed
+
+
+load_dotenv()
+
+# --- Database Configuration ---
+# Load configuration from environment variables
+db_config = {
+    'host': os.getenv('DB_HOST', 'localhost'),
+    'database': os.getenv('DB_DATABASE'),
+    'user': os.getenv('DB_USER'),
+    'password': os.getenv('DB_PASSWORD'),
+    'port': os.getenv('DB_PORT', 3306)
+}
+
+# --- Pool Configuration ---
+pool_config = {
+    'size': int(os.getenv('DB_POOL_SIZE', 5)),
+    'timeout': float(os.getenv('DB_POOL_TIMEOUT', 5)),
+    'recycle': float(os.getenv('DB_POOL_RECYCLE', 3600)),
+    'ping_interval': float(os.getenv('DB_POOL_PING_INTERVAL', 30)),
+}
+
+
+def _track_errors(pooled, value):
+    """Wrap a connection or cursor method so that an Error marks the pooled connection as failed."""
+    if not callable(value):
+        return value
+
+    @wraps(value)
+    def call(*args, **kwargs):
+        try:
+            return value(*args, **kwargs)
+        except Error:
+            pooled._failed = True
+            raise
+    return call
+
+
+class PooledCursor:
+    """Cursor of a PooledConnection; an Error it raises marks the connection as failed."""
+
+    def __init__(self, pooled, cursor):
+        self._pooled = pooled
+        self._cursor = cursor
+
+    def __getattr__(self, name):
+        return _track_errors(self._pooled, getattr(self._cursor, name))
+
+
+class PooledConnection:
+    """
+    Wrapper around a MySQL connection checked out of a ConnectionPool.
+
+    Behaves like the underlying connection, except that close() hands the
+    connection back to the pool instead of closing the socket. A connection
+    whose queries raised an Error is discarded on close rather than reused.
+    """
+
+    def __init__(self, pool, conn, created_at):
+        self._pool = pool
+        self._conn = conn
+        self._created_at = created_at
+        self._last_used = time.monotonic()
+        self._checked_out = False
+        self._failed = False
+
+    def __getattr__(self, name):
+        return _track_errors(self, getattr(self._conn, name))
+
+    def cursor(self, *args, **kwargs):
+        return PooledCursor(self, _track_errors(self, self._conn.cursor)(*args, **kwargs))
+
+    def close(self):
+        """Return the connection to the pool."""
+        if self._checked_out:
+            self._pool.release(self)
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of MySQL connections shared by all report endpoints.
+
+    Connections are created lazily up to `size`. On checkout a connection is
+    health checked (ping, with reconnect) if it has been idle longer than
+    `ping_interval`, and replaced once it is older than `recycle` seconds.
+    Connections that raised an Error while checked out are closed on release,
+    so a socket broken by a server restart is never handed out again.
+    Callers that find the pool exhausted wait up to `timeout` seconds.
+    """
+
+    def __init__(self, config, size=5, timeout=5.0, recycle=3600.0, ping_interval=30.0):
+        self.config = config
+        self.size = size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.ping_interval = ping_interval
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._stats = {
+            'checkouts': 0,
+            'checkout_failures': 0,
+            'timeouts': 0,
+            'connections_opened': 0,
+            'reconnects': 0,
+            'recycled': 0,
+            'stale_discarded': 0,
+            'failed_discarded': 0,
+            'wait_time_total': 0.0,
+            'wait_time_max': 0.0,
+        }
+
+    def _open(self):
+        conn = mysql.connector.connect(**self.config)
+        with self._lock:
+            self._stats['connections_opened'] += 1
+        return PooledConnection(self, conn, time.monotonic())
+
+    def _discard(self, pooled):
+        try:
+            pooled._conn.close()
+        except Error:
+            pass
+        with self._lock:
+            self._created -= 1
+
+    def _is_healthy(self, pooled):
+        """Ping connections that have been idle for a while, reconnecting stale sockets."""
+        if time.monotonic() - pooled._last_used < self.ping_interval:
+            return True
+        if pooled._conn.is_connected():
+            return True
+        try:
+            pooled._conn.reconnect(attempts=1, delay=0)
+        except Error:
+            return False
+        with self._lock:
+            self._stats['reconnects'] += 1
+        return True
+
+    def get_connection(self):
+        """Check a connection out of the pool, waiting up to `timeout` seconds."""
+        start = time.monotonic()
+        pooled = None
+        try:
+            while pooled is None:
+                try:
+                    pooled = self._idle.get_nowait()
+                except queue.Empty:
+                    with self._lock:
+                        can_open = self._created < self.size
+                        if can_open:
+                            self._created += 1
+                    if can_open:
+                        try:
+                            pooled = self._open()
+                        except Error:
+                            with self._lock:
+                                self._created -= 1
+                            raise
+                        break
+                    remaining = self.timeout - (time.monotonic() - start)
+                    if remaining <= 0:
+                        with self._lock:
+                            self._stats['timeouts'] += 1
+                        raise PoolError("Timed out waiting for a pooled database connection")
+                    try:
+                        pooled = self._idle.get(timeout=remaining)
+                    except queue.Empty:
+                        continue
+
+                if self.recycle and time.monotonic() - pooled._created_at > self.recycle:
+                    with self._lock:
+                        self._stats['recycled'] += 1
+                    self._discard(pooled)
+                    pooled = None
+                elif not self._is_healthy(pooled):
+                    with self._lock:
+                        self._stats['stale_discarded'] += 1
+                    self._discard(pooled)
+                    pooled = None
+        except Error:
+            with self._lock:
+                self._stats['checkout_failures'] += 1
+            raise
+
+        waited = time.monotonic() - start
+        with self._lock:
+            self._stats['checkouts'] += 1
+            self._stats['wait_time_total'] += waited
+            self._stats['wait_time_max'] = max(self._stats['wait_time_max'], waited)
+        pooled._checked_out = True
+        return pooled
+
+    def release(self, pooled):
+        """
+        Return a connection to the pool, rolling back any open transaction.
+        Connections that failed or still have unread results are closed instead,
+        and only a clean use counts as recent activity for the ping_interval check.
+        """
+        pooled._checked_out = False
+        # Unread rows of an abandoned query would break the next user's queries
+        if pooled._failed or getattr(pooled._conn, 'unread_result', False):
+            with self._lock:
+                self._stats['failed_discarded'] += 1
+            self._discard(pooled)
+            return
+        try:
+            if pooled._conn.in_transaction:
+                pooled._conn.rollback()
+        except Error:
+            self._discard(pooled)
+            return
+        pooled._last_used = time.monotonic()
+        self._idle.put(pooled)
+
+    def stats(self):
+        """Snapshot of pool usage and checkout metrics."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = self.size
+            stats['open'] = self._created
+        stats['idle'] = self._idle.qsize()
+        stats['in_use'] = stats['open'] - stats['idle']
+        checkouts = stats['checkouts']
+        stats['wait_time_avg'] = stats['wait_time_total'] / checkouts if checkouts else 0.0
+        return stats
+
+
+pool = ConnectionPool(db_config, **pool_config)
+
+
+# --- Database Connection Helper ---
+def get_db_connection():
+    """Checks a connection out of the shared pool. Call close() to return it."""
+    try:
+        with timed('db_connect'):
+            return pool.get_connection()
+    except Error as e:
+        print(f"Error connecting to MySQL database: {e}")
+        return None
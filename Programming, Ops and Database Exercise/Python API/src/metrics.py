@@ -0,0 +1,204 @@
+import bisect
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request
+
+
+logger = logging.getLogger(__name__)
+
+# --- Metrics Configuration ---
+# Queries slower than this many milliseconds are logged with their parameters.
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', 500))
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Per-request phases, in the order they are reported in Server-Timing
+PHASES = ('db_connect', 'db_query', 'serialize')
+
+
+class Counter:
+    """Prometheus counter, one value per label set."""
+
+    kind = 'counter'
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label_values=(), amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, list(zip(self.labels, label_values)), value)
+                    for label_values, value in self._values.items()]
+
+
+class Histogram:
+    """Prometheus histogram with fixed buckets, one series per label set."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=DURATION_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_values, value):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            for label_values, (bucket_counts, total, count) in self._series.items():
+                labels = list(zip(self.labels, label_values))
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, bucket_counts):
+                    cumulative += bucket_count
+                    samples.append((f"{self.name}_bucket", labels + [('le', repr(bound))], cumulative))
+                samples.append((f"{self.name}_bucket", labels + [('le', '+Inf')], count))
+                samples.append((f"{self.name}_sum", labels, total))
+                samples.append((f"{self.name}_count", labels, count))
+        return samples
+
+
+def _format_labels(pairs):
+    if not pairs:
+        return ''
+    escaped = []
+    for key, value in pairs:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        escaped.append(f'{key}="{value}"')
+    return '{' + ','.join(escaped) + '}'
+
+
+REQUESTS = Counter('greyshop_http_requests_total', 'HTTP requests handled.', ('endpoint', 'method', 'status'))
+REQUEST_DURATION = Histogram('greyshop_http_request_duration_seconds', 'Wall time per request.', ('endpoint',))
+PHASE_DURATION = {
+    'db_connect': Histogram('greyshop_db_connect_duration_seconds',
+                            'Time to check a connection out of the pool.', ('endpoint',)),
+    'db_query': Histogram('greyshop_db_query_duration_seconds',
+                          'Time executing queries and fetching rows.', ('endpoint',)),
+    'serialize': Histogram('greyshop_serialization_duration_seconds',
+                           'Time serializing response bodies.', ('endpoint',)),
+}
+ROWS = Counter('greyshop_db_rows_returned_total', 'Rows returned by report queries.', ('endpoint',))
+SLOW_QUERIES = Counter('greyshop_slow_queries_total', 'Queries slower than SLOW_QUERY_MS.', ('endpoint',))
+METRICS = [REQUESTS, REQUEST_DURATION, *PHASE_DURATION.values(), ROWS, SLOW_QUERIES]
+
+# Callables returning [(name, kind, help, value)] gauges/counters sampled at scrape time
+collectors = []
+
+
+def _endpoint():
+    return request.url_rule.rule if request.url_rule else 'unmatched'
+
+
+# --- Request Instrumentation ---
+def record(phase, seconds):
+    """Add time spent in a phase (db_connect, db_query, serialize) to the current request."""
+    if has_request_context() and 'timings' in g:
+        g.timings[phase] = g.timings.get(phase, 0.0) + seconds
+
+
+@contextmanager
+def timed(phase):
+    """Context manager recording the time spent in its block against a request phase."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(phase, time.perf_counter() - start)
+
+
+def fetch_all(cursor, query, params=None):
+    """
+    Execute a query and fetch all rows, recording query time and row count on the
+    current request and logging the query if it is slower than SLOW_QUERY_MS.
+    """
+    start = time.perf_counter()
+    cursor.execute(query, params)
+    rows = cursor.fetchall()
+    elapsed = time.perf_counter() - start
+    record('db_query', elapsed)
+    if has_request_context() and 'timings' in g:
+        g.rows += len(rows)
+
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        endpoint = _endpoint() if has_request_context() else 'none'
+        SLOW_QUERIES.inc((endpoint,))
+        logger.warning(f"Slow query ({elapsed * 1000:.1f} ms, {len(rows)} rows) on {endpoint}: "
+                       f"{' '.join(query.split())} params={params}")
+    return rows
+
+
+def init_app(app):
+    """Instrument every request of a Flask app and serve /metrics in Prometheus text format."""
+
+    @app.before_request
+    def start_timer():
+        g.request_start = time.perf_counter()
+        g.timings = {}
+        g.rows = 0
+
+    @app.after_request
+    def observe_request(response):
+        if 'request_start' not in g:
+            return response
+        total = time.perf_counter() - g.request_start
+        endpoint = _endpoint()
+
+        REQUESTS.inc((endpoint, request.method, str(response.status_code)))
+        REQUEST_DURATION.observe((endpoint,), total)
+        for phase, seconds in g.timings.items():
+            PHASE_DURATION[phase].observe((endpoint,), seconds)
+        if g.rows:
+            ROWS.inc((endpoint,), g.rows)
+
+        server_timing = [f"total;dur={total * 1000:.2f}"]
+        for phase in PHASES:
+            if phase in g.timings:
+                desc = f';desc="rows={g.rows}"' if phase == 'db_query' else ''
+                server_timing.append(f"{phase}{desc};dur={g.timings[phase] * 1000:.2f}")
+        response.headers['Server-Timing'] = ', '.join(server_timing)
+        return response
+
+    @app.route('/metrics', methods=['GET'])
+    def get_metrics():
+        """Endpoint exposing request, query and pool metrics in Prometheus text format."""
+        return app.response_class(render(), mimetype='text/plain; version=0.0.4')
+
+
+def render():
+    """Render all metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in METRICS:
+        lines.append(f"# HELP {metric.name} {metric.help_text}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for name, labels, value in metric.samples():
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+
+    for collect in collectors:
+        for name, kind, help_text, value in collect():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name} {value}")
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,84 @@
+# --- Report Queries ---
+# The reports read the pre-aggregated summary tables (SQL/DDL/report_summaries_DDL.sql)
+# maintained by refresh_aggregate.py, so none of them scans greyshop.orders_aggregate.
+
+TOP_CUSTOMERS = """
+    SELECT
+    customer_id,
+    money_spent AS customer_money_spent
+    FROM greyshop.customer_sales_summary
+    WHERE spending_orders > 0
+    ORDER BY money_spent DESC
+    LIMIT %s;
+"""
+
+MONTHLY_SALES = """
+    SELECT
+    month,
+    total_number_of_orders,
+    total_monthly_sales
+    FROM greyshop.monthly_sales_summary
+    ORDER BY month
+"""
+
+PRODUCTS_NEVER_ORDERED = """
+    SELECT
+    *
+    FROM greyshop.product_inventory
+    WHERE quantity_sold = 0
+"""
+
+# Keyset pagination: rows after the `cursor` key, one page at a time.
+PRODUCTS_NEVER_ORDERED_PAGE = """
+    SELECT
+    *
+    FROM greyshop.product_inventory
+    WHERE quantity_sold = 0
+    AND product_id > %s
+    ORDER BY product_id
+    LIMIT %s
+"""
+
+AOV_BY_COUNTRY = """
+    SELECT
+    country,
+    total_sales,
+    total_orders,
+    total_sales / total_orders AS aov
+    FROM greyshop.country_sales_summary
+    ORDER BY country
+"""
+
+FREQUENT_BUYERS = """
+    SELECT
+    customer_id,
+    total_orders
+    FROM greyshop.customer_sales_summary
+    WHERE total_orders > 1
+"""
+
+FREQUENT_BUYERS_PAGE = """
+    SELECT
+    customer_id,
+    total_orders
+    FROM greyshop.customer_sales_summary
+    WHERE customer_id > %s
+    AND total_orders > 1
+    ORDER BY customer_id
+    LIMIT %s
+"""
+
+# Report name -> (query, example parameters), used by the EXPLAIN check.
+REPORT_QUERIES = {
+    'top_customers': (TOP_CUSTOMERS, (1,)),
+    'monthly_sales': (MONTHLY_SALES, ()),
+    'products_never_ordered': (PRODUCTS_NEVER_ORDERED, ()),
+    'aov_by_country': (AOV_BY_COUNTRY, ()),
+    'frequent_buyers': (FREQUENT_BUYERS, ()),
+}
+
+# Paginated variants of the reports above, also checked by the EXPLAIN check.
+PAGE_QUERIES = {
+    'products_never_ordered_page': (PRODUCTS_NEVER_ORDERED_PAGE, (0, 100)),
+    'frequent_buyers_page': (FREQUENT_BUYERS_PAGE, (0, 100)),
+}
@@ -0,0 +1,350 @@
+import argparse
+import logging
+import os
+import time
+import urllib.request
+
+import mysql.connector
+from mysql.connector import Error
+
+from db import db_config
+
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+AGGREGATE_TABLE = 'greyshop.orders_aggregate'
+
+# Same aggregation as SQL/DML/order_aggregate_DML.sql, with a placeholder
+# for restricting it to the orders touched since the last run.
+AGGREGATE_QUERY = """
+    SELECT
+    o.order_id,
+    o.customer_id,
+    o.order_date,
+    o.status,
+    c.country,
+    COALESCE(SUM(oi.quantity * oi.unit_price), 0) AS total_amount
+    FROM greyshop.orders o
+    {touched_join}
+    LEFT JOIN greyshop.order_items oi
+    ON o.order_id = oi.order_id
+    LEFT JOIN greyshop.customers c
+    ON o.customer_id = c.customer_id
+    GROUP BY o.order_id, o.customer_id, o.order_date, o.status, c.country
+"""
+
+AGGREGATE_COLUMNS = "order_id, customer_id, order_date, status, country, total_amount"
+
+# Full rebuild of the report summary tables, as in SQL/DML/report_summaries_DML.sql.
+SUMMARY_REBUILD = [
+    "DELETE FROM greyshop.customer_sales_summary",
+    """
+    INSERT INTO greyshop.customer_sales_summary(customer_id, total_orders, spending_orders, money_spent)
+    SELECT
+    customer_id,
+    count(order_id),
+    sum(status != 'cancelled'),
+    sum(CASE WHEN status != 'cancelled' THEN total_amount ELSE 0 END)
+    FROM greyshop.orders_aggregate
+    GROUP BY customer_id
+    """,
+    "DELETE FROM greyshop.country_sales_summary",
+    """
+    INSERT INTO greyshop.country_sales_summary(country, total_orders, total_sales)
+    SELECT
+    country,
+    count(order_id),
+    sum(total_amount)
+    FROM greyshop.orders_aggregate
+    GROUP BY country
+    """,
+    "DELETE FROM greyshop.monthly_sales_summary",
+    """
+    INSERT INTO greyshop.monthly_sales_summary(month, total_number_of_orders, total_monthly_sales)
+    SELECT
+    MONTH(order_date),
+    count(order_id),
+    sum(total_amount)
+    FROM greyshop.orders_aggregate
+    WHERE status in ('Shipped','Delivered')
+    GROUP BY MONTH(order_date)
+    """,
+]
+
+# Incremental maintenance of the summary tables. aggregate_delta holds the old
+# rows of every touched order with sign -1 and their new rows with sign +1,
+# so applying the signed sums leaves the summaries equal to a full rebuild.
+SUMMARY_DELTA = [
+    """
+    INSERT INTO greyshop.customer_sales_summary(customer_id, total_orders, spending_orders, money_spent)
+    SELECT
+    customer_id,
+    sum(sign),
+    sum(CASE WHEN status != 'cancelled' THEN sign ELSE 0 END),
+    sum(CASE WHEN status != 'cancelled' THEN sign * total_amount ELSE 0 END)
+    FROM aggregate_delta
+    GROUP BY customer_id
+    ON DUPLICATE KEY UPDATE
+    total_orders = total_orders + VALUES(total_orders),
+    spending_orders = spending_orders + VALUES(spending_orders),
+    money_spent = money_spent + VALUES(money_spent)
+    """,
+    "DELETE FROM greyshop.customer_sales_summary WHERE total_orders <= 0",
+    """
+    INSERT INTO greyshop.country_sales_summary(country, total_orders, total_sales)
+    SELECT
+    country,
+    sum(sign),
+    sum(sign * total_amount)
+    FROM aggregate_delta
+    GROUP BY country
+    ON DUPLICATE KEY UPDATE
+    total_orders = total_orders + VALUES(total_orders),
+    total_sales = total_sales + VALUES(total_sales)
+    """,
+    "DELETE FROM greyshop.country_sales_summary WHERE total_orders <= 0",
+    """
+    INSERT INTO greyshop.monthly_sales_summary(month, total_number_of_orders, total_monthly_sales)
+    SELECT
+    MONTH(order_date),
+    sum(sign),
+    sum(sign * total_amount)
+    FROM aggregate_delta
+    WHERE status in ('Shipped','Delivered')
+    GROUP BY MONTH(order_date)
+    ON DUPLICATE KEY UPDATE
+    total_number_of_orders = total_number_of_orders + VALUES(total_number_of_orders),
+    total_monthly_sales = total_monthly_sales + VALUES(total_monthly_sales)
+    """,
+    "DELETE FROM greyshop.monthly_sales_summary WHERE total_number_of_orders <= 0",
+]
+
+
+class AggregateRefresher:
+    """
+    Keeps greyshop.orders_aggregate up to date without leaving it empty mid-refresh.
+
+    Incremental runs re-aggregate only orders whose row (or one of whose items)
+    changed since the stored watermark, plus orders tombstoned in
+    greyshop.deleted_orders, replacing them inside one transaction.
+    Full runs build a fresh copy of the table and swap it in with an atomic
+    RENAME TABLE. The report summary tables are updated in the same
+    transaction as the aggregate rows they are derived from.
+    """
+
+    def __init__(self, conn, overlap_seconds=300):
+        self.conn = conn
+        self.overlap_seconds = overlap_seconds
+        self.timings = {}
+
+    def _timed(self, step, cursor, query, params=None):
+        start = time.perf_counter()
+        cursor.execute(query, params)
+        self.timings[step] = self.timings.get(step, 0.0) + time.perf_counter() - start
+        return cursor.rowcount
+
+    def get_watermark(self, cursor):
+        cursor.execute(
+            "SELECT watermark FROM greyshop.aggregate_refresh_state WHERE table_name = %s",
+            ('orders_aggregate',)
+        )
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+    def save_state(self, cursor, watermark, mode, orders, seconds):
+        cursor.execute(
+            """
+            INSERT INTO greyshop.aggregate_refresh_state
+            (table_name, watermark, last_run_at, last_run_mode, last_run_orders, last_run_seconds)
+            VALUES (%s, %s, CURRENT_TIMESTAMP(6), %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+            watermark = VALUES(watermark),
+            last_run_at = VALUES(last_run_at),
+            last_run_mode = VALUES(last_run_mode),
+            last_run_orders = VALUES(last_run_orders),
+            last_run_seconds = VALUES(last_run_seconds)
+            """,
+            ('orders_aggregate', watermark, mode, orders, round(seconds, 3))
+        )
+
+    def refresh(self, full=False):
+        """Run one refresh. Falls back to a full rebuild when no watermark is stored yet."""
+        self.timings = {}
+        start = time.perf_counter()
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute("SELECT CURRENT_TIMESTAMP(6)")
+            new_watermark = cursor.fetchone()[0]
+            watermark = None if full else self.get_watermark(cursor)
+            self.conn.rollback()
+
+            if watermark is None:
+                mode = 'full'
+                orders = self._full_refresh(cursor)
+            else:
+                mode = 'incremental'
+                orders = self._incremental_refresh(cursor, watermark)
+
+            self.timings['total'] = time.perf_counter() - start
+            self.save_state(cursor, new_watermark, mode, orders, self.timings['total'])
+            self.conn.commit()
+        except Error:
+            self.conn.rollback()
+            raise
+        finally:
+            cursor.close()
+
+        steps = ", ".join(f"{step}={seconds:.3f}s" for step, seconds in self.timings.items())
+        logger.info(f"{mode.capitalize()} refresh of orders_aggregate: {orders} orders ({steps})")
+        return mode, orders
+
+    def _incremental_refresh(self, cursor, watermark):
+        """
+        Re-aggregate orders touched since watermark (minus overlap) and deleted
+        orders in one transaction. Deleted orders have no row to re-aggregate,
+        so their aggregate rows and summary shares are only removed.
+        """
+        cursor.execute("DROP TEMPORARY TABLE IF EXISTS touched_orders")
+        cursor.execute("CREATE TEMPORARY TABLE touched_orders (order_id INT PRIMARY KEY)")
+        since = (watermark, self.overlap_seconds)
+        self._timed('detect', cursor, """
+            INSERT IGNORE INTO touched_orders (order_id)
+            SELECT order_id FROM greyshop.orders
+            WHERE updated_at >= %s - INTERVAL %s SECOND
+            UNION
+            SELECT order_id FROM greyshop.order_items
+            WHERE updated_at >= %s - INTERVAL %s SECOND
+            UNION
+            SELECT order_id FROM greyshop.deleted_orders
+        """, since + since)
+        cursor.execute("SELECT COUNT(*) FROM touched_orders")
+        orders = cursor.fetchone()[0]
+
+        # The delete/insert below, the summary deltas and the watermark update are
+        # committed together, so readers see either the old or the new state.
+        if orders:
+            cursor.execute("DROP TEMPORARY TABLE IF EXISTS aggregate_delta")
+            cursor.execute("""
+                CREATE TEMPORARY TABLE aggregate_delta (
+                customer_id INT NOT NULL,
+                order_date DATE NOT NULL,
+                status VARCHAR(20) NOT NULL,
+                country VARCHAR(50) NOT NULL,
+                total_amount DECIMAL(42, 2) NOT NULL,
+                sign TINYINT NOT NULL
+                )
+            """)
+            delta_insert = f"""
+                INSERT INTO aggregate_delta
+                SELECT oa.customer_id, oa.order_date, oa.status, oa.country, oa.total_amount, %s
+                FROM {AGGREGATE_TABLE} oa
+                JOIN touched_orders t ON oa.order_id = t.order_id
+            """
+            self._timed('summaries', cursor, delta_insert, (-1,))
+            self._timed('delete', cursor, f"""
+                DELETE oa FROM {AGGREGATE_TABLE} oa
+                JOIN touched_orders t ON oa.order_id = t.order_id
+            """)
+            touched_join = "JOIN touched_orders t ON o.order_id = t.order_id"
+            self._timed('insert', cursor, f"""
+                INSERT INTO {AGGREGATE_TABLE} ({AGGREGATE_COLUMNS})
+                {AGGREGATE_QUERY.format(touched_join=touched_join)}
+            """)
+            self._timed('summaries', cursor, delta_insert, (1,))
+            for query in SUMMARY_DELTA:
+                self._timed('summaries', cursor, query)
+            cursor.execute("DROP TEMPORARY TABLE aggregate_delta")
+            # Only the tombstones read above, committed with the rows they removed
+            self._timed('delete', cursor, """
+                DELETE d FROM greyshop.deleted_orders d
+                JOIN touched_orders t ON d.order_id = t.order_id
+            """)
+
+        cursor.execute("DROP TEMPORARY TABLE touched_orders")
+        return orders
+
+    def _full_refresh(self, cursor):
+        """Rebuild into a shadow table and swap it in with an atomic rename."""
+        # The rebuild leaves out every order deleted so far. Tombstones written
+        # after this point are handled by the next incremental run.
+        cursor.execute("DELETE FROM greyshop.deleted_orders")
+        self.conn.commit()
+        cursor.execute(f"DROP TABLE IF EXISTS {AGGREGATE_TABLE}_new, {AGGREGATE_TABLE}_old")
+        cursor.execute(f"CREATE TABLE {AGGREGATE_TABLE}_new LIKE {AGGREGATE_TABLE}")
+        orders = self._timed('insert', cursor, f"""
+            INSERT INTO {AGGREGATE_TABLE}_new ({AGGREGATE_COLUMNS})
+            {AGGREGATE_QUERY.format(touched_join='')}
+        """)
+        self.conn.commit()
+        self._timed('swap', cursor, f"""
+            RENAME TABLE {AGGREGATE_TABLE} TO {AGGREGATE_TABLE}_old,
+            {AGGREGATE_TABLE}_new TO {AGGREGATE_TABLE}
+        """)
+        cursor.execute(f"DROP TABLE {AGGREGATE_TABLE}_old")
+        for query in SUMMARY_REBUILD:
+            self._timed('summaries', cursor, query)
+        return orders
+
+
+def invalidate_api_cache(url):
+    """
+    Tell the Reports API to drop cached results (POST /reports/cache/invalidate),
+    sending CACHE_INVALIDATE_TOKEN in the X-Cache-Token header when it is set.
+    """
+    token = os.getenv('CACHE_INVALIDATE_TOKEN')
+    headers = {'X-Cache-Token': token} if token else {}
+    try:
+        req = urllib.request.Request(url, headers=headers, method='POST')
+        with urllib.request.urlopen(req, timeout=10) as response:
+            logger.info(f"Invalidated API cache: {response.read().decode()}")
+    except OSError as e:
+        logger.error(f"Failed to invalidate API cache at {url}: {e}")
+
+
+def parse_arguments():
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description="Refresh greyshop.orders_aggregate")
+    parser.add_argument("--full", action="store_true",
+                        help="Rebuild the whole table instead of refreshing changed orders")
+    parser.add_argument("--interval", type=float, default=0,
+                        help="Keep running, refreshing every N seconds (default: run once)")
+    parser.add_argument("--overlap", type=float, default=300,
+                        help="Seconds to look back past the watermark to catch late commits")
+    parser.add_argument("--invalidate-url",
+                        help="Reports API cache invalidation URL to POST to after each refresh")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    conn = mysql.connector.connect(**db_config)
+    refresher = AggregateRefresher(conn, overlap_seconds=args.overlap)
+    full = args.full
+
+    try:
+        while True:
+            try:
+                conn.ping(reconnect=True, attempts=3, delay=5)
+                mode, orders = refresher.refresh(full=full)
+                if orders and args.invalidate_url:
+                    invalidate_api_cache(args.invalidate_url)
+                full = False
+            except Error as e:
+                logger.error(f"Refresh of orders_aggregate failed: {e}")
+                if not args.interval:
+                    raise
+            if not args.interval:
+                break
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        logger.info("Stopping refresh job...")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import datetime
+import decimal
+import json
+import os
+
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# --- JSON Backend ---
+# orjson is used when installed, unless JSON_BACKEND=json.
+JSON_BACKEND = os.getenv('JSON_BACKEND', 'orjson' if orjson else 'json')
+
+
+def default(value):
+    """Encode the database types the JSON backends do not handle themselves."""
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if isinstance(value, datetime.timedelta):
+        return value.total_seconds()
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode('utf-8', errors='replace')
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+if JSON_BACKEND == 'orjson' and orjson:
+    def dumps(obj):
+        """Serialize obj to JSON bytes in one pass, converting Decimal/date values on the way."""
+        return orjson.dumps(obj, default=default)
+
+    loads = orjson.loads
+else:
+    _encoder = json.JSONEncoder(default=default, separators=(',', ':'), ensure_ascii=False)
+
+    def dumps(obj):
+        """Serialize obj to JSON bytes in one pass, converting Decimal/date values on the way."""
+        return _encoder.encode(obj).encode('utf-8')
+
+    loads = json.loads
+
+
+class ReportJSONProvider(JSONProvider):
+    """Flask JSON provider that serializes with the configured backend, so jsonify needs no pre-conversion."""
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj), mimetype='application/json')
+
+
+# --- Response Shapes ---
+def records(columns, rows):
+    """Rows as a list of {column: value} dicts (the default response format)."""
+    return [dict(zip(columns, row)) for row in rows]
+
+
+def columnar(columns, rows):
+    """Rows as {column: [values...]}, one array per column (?format=columnar)."""
+    if not rows:
+        return {column: [] for column in columns}
+    return {column: list(values) for column, values in zip(columns, zip(*rows))}
+
+
+def shape_rows(columns, rows, response_format=None):
+    """Shape tuple rows for a response in the requested format ('columnar' or records)."""
+    if response_format == 'columnar':
+        return columnar(columns, rows)
+    return records(columns, rows)
@@ -0,0 +1,9 @@
+-- bookkeeping for the incremental orders_aggregate refresh (Python API/src/refresh_aggregate.py) --
+CREATE TABLE IF NOT EXISTS greyshop.aggregate_refresh_state (
+table_name VARCHAR(64) PRIMARY KEY,
+watermark TIMESTAMP(6) NOT NULL,
+last_run_at TIMESTAMP(6) NOT NULL,
+last_run_mode VARCHAR(20) NOT NULL,
+last_run_orders INT NOT NULL,
+last_run_seconds DECIMAL(10,3) NOT NULL
+);
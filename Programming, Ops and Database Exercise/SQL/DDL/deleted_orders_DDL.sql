@@ -0,0 +1,14 @@
+-- tombstones of deleted orders for the incremental orders_aggregate refresh (Python API/src/refresh_aggregate.py) --
+CREATE TABLE IF NOT EXISTS greyshop.deleted_orders (
+order_id INT PRIMARY KEY,
+deleted_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6)
+);
+
+DROP TRIGGER IF EXISTS greyshop.orders_after_delete;
+
+-- a deleted order leaves no row to detect by updated_at, so record its id --
+CREATE TRIGGER greyshop.orders_after_delete
+AFTER DELETE ON greyshop.orders
+FOR EACH ROW
+INSERT INTO greyshop.deleted_orders (order_id) VALUES (OLD.order_id)
+ON DUPLICATE KEY UPDATE deleted_at = CURRENT_TIMESTAMP(6);
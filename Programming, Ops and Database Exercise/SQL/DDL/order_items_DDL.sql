@@ -7,6 +7,21 @@ order_id INT,
 product_id INT, 
 quantity INT, 
 unit_price DECIMAL(10,2), 
+updated_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6), 
+INDEX idx_order_items_updated_at (updated_at), 
 FOREIGN KEY (order_id) REFERENCES orders(order_id), 
 FOREIGN KEY (product_id) REFERENCES products(product_id) 
-);
\ No newline at end of file
+);
+
+-- order_items rows that are deleted, or moved to another order, leave nothing
+-- behind for refresh_aggregate.py to detect, so touch the order they left --
+CREATE TRIGGER greyshop.order_items_after_delete
+AFTER DELETE ON greyshop.order_items
+FOR EACH ROW
+UPDATE greyshop.orders SET updated_at = CURRENT_TIMESTAMP(6) WHERE order_id = OLD.order_id;
+
+CREATE TRIGGER greyshop.order_items_after_update
+AFTER UPDATE ON greyshop.order_items
+FOR EACH ROW
+UPDATE greyshop.orders SET updated_at = CURRENT_TIMESTAMP(6)
+WHERE order_id = OLD.order_id AND NOT (OLD.order_id <=> NEW.order_id);
\ No newline at end of file
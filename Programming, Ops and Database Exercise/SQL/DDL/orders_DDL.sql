@@ -6,5 +6,7 @@ order_id INT PRIMARY KEY,
 customer_id INT, 
 order_date DATE, 
 status VARCHAR(20), 
+updated_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6), 
+INDEX idx_orders_updated_at (updated_at), 
 FOREIGN KEY (customer_id) REFERENCES customers(customer_id) 
 );
\ No newline at end of file
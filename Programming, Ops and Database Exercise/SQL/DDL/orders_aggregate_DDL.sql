@@ -7,5 +7,9 @@ CREATE TABLE IF NOT EXISTS orders_aggregate (
     status VARCHAR(20) NOT NULL,
     country VARCHAR(50) NOT NULL,
     total_amount DECIMAL(42, 2) NOT NULL,
-    PRIMARY KEY (order_id)
+    PRIMARY KEY (order_id),
+    -- covering indexes for the report access paths --
+    INDEX idx_orders_aggregate_customer (customer_id, status, total_amount),
+    INDEX idx_orders_aggregate_country (country, total_amount),
+    INDEX idx_orders_aggregate_status_date (status, order_date, total_amount)
 );
\ No newline at end of file
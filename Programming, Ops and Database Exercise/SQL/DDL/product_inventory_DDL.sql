@@ -4,5 +4,6 @@ product_id INT PRIMARY KEY NOT NULL,
 quantity_sold INT NOT NULL,
 quantity_available INT NOT NULL,
 category VARCHAR(20) NOT NULL,
-unit_price DECIMAL(10,2) NOT NULL
+unit_price DECIMAL(10,2) NOT NULL,
+INDEX idx_product_inventory_quantity_sold (quantity_sold)
 );
\ No newline at end of file
@@ -0,0 +1,25 @@
+-- pre-aggregated report tables, maintained from orders_aggregate by Python API/src/refresh_aggregate.py --
+
+-- per-customer totals: top customers and frequent buyers --
+CREATE TABLE IF NOT EXISTS greyshop.customer_sales_summary (
+customer_id INT PRIMARY KEY,
+total_orders INT NOT NULL,
+spending_orders INT NOT NULL, -- orders that are not cancelled --
+money_spent DECIMAL(42,2) NOT NULL, -- total of orders that are not cancelled --
+INDEX idx_customer_summary_money_spent (money_spent, spending_orders),
+INDEX idx_customer_summary_total_orders (total_orders)
+);
+
+-- per-country totals: average order value by country --
+CREATE TABLE IF NOT EXISTS greyshop.country_sales_summary (
+country VARCHAR(50) PRIMARY KEY,
+total_orders INT NOT NULL,
+total_sales DECIMAL(42,2) NOT NULL
+);
+
+-- per-month totals of Shipped and Delivered orders: monthly sales report --
+CREATE TABLE IF NOT EXISTS greyshop.monthly_sales_summary (
+month TINYINT PRIMARY KEY,
+total_number_of_orders INT NOT NULL,
+total_monthly_sales DECIMAL(42,2) NOT NULL
+);
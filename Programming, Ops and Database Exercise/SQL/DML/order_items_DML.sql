@@ -1,4 +1,4 @@
-INSERT INTO order_items VALUES 
+INSERT INTO order_items(order_item_id, order_id, product_id, quantity, unit_price) VALUES 
 (1, 1, 1, 1, 1200.00),  -- Laptop 
 (2, 1, 4, 2, 85.50),    -- Coffee Maker 
 (3, 2, 2, 1, 800.00),   -- Smartphone 
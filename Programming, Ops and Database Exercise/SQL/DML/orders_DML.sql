@@ -1,4 +1,4 @@
-INSERT INTO orders VALUES 
+INSERT INTO orders(order_id, customer_id, order_date, status) VALUES 
 (1, 1, '2023-11-15', 'Shipped'), 
 (2, 2, '2023-11-20', 'Pending'), 
 (3, 1, '2023-12-01', 'Delivered'), 
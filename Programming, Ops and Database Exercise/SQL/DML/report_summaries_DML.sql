@@ -0,0 +1,29 @@
+-- full rebuild of the report summary tables from orders_aggregate --
+DELETE FROM greyshop.customer_sales_summary;
+INSERT INTO greyshop.customer_sales_summary(customer_id, total_orders, spending_orders, money_spent)
+SELECT
+customer_id,
+count(order_id) AS total_orders,
+sum(status != 'cancelled') AS spending_orders,
+sum(CASE WHEN status != 'cancelled' THEN total_amount ELSE 0 END) AS money_spent
+FROM greyshop.orders_aggregate
+GROUP BY customer_id;
+
+DELETE FROM greyshop.country_sales_summary;
+INSERT INTO greyshop.country_sales_summary(country, total_orders, total_sales)
+SELECT
+country,
+count(order_id) AS total_orders,
+sum(total_amount) AS total_sales
+FROM greyshop.orders_aggregate
+GROUP BY country;
+
+DELETE FROM greyshop.monthly_sales_summary;
+INSERT INTO greyshop.monthly_sales_summary(month, total_number_of_orders, total_monthly_sales)
+SELECT
+MONTH(order_date) AS month,
+count(order_id) AS total_number_of_orders,
+sum(total_amount) AS total_monthly_sales
+FROM greyshop.orders_aggregate
+WHERE status in ('Shipped','Delivered')
+GROUP BY MONTH(order_date);